@@ -0,0 +1,241 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+from sqlalchemy import bindparam, or_, select, update
+
+import clerk
+import events
+from database import db, dialect_insert
+from model import BackfillCheckpoint, BackfillRun, User
+from users import PLACEHOLDER_NAME
+
+JOB_NAME = "user_names"
+RUN_FIELDS = ("status", "error", "processed", "updated", "failed", "resumed_from", "started_at", "finished_at")
+RETENTION = timedelta(days=30)
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class BackfillJob:
+    """Resolves placeholder user names from Clerk in concurrent, resumable chunks.
+
+    Users are walked in primary-key order, chunk_size at a time. Each chunk's
+    profiles are fetched concurrently (bounded by `concurrency` and `rate`
+    requests per second), written back with one executemany UPDATE, and
+    committed together with the checkpoint row and the job's BackfillRun
+    counters. A crashed or restarted job picks up after the last committed
+    user id, and any worker can report on any run.
+    """
+
+    def __init__(self, app, concurrency=8, rate=10.0, chunk_size=200, job_id=None):
+        self.app = app
+        self.id = job_id or uuid.uuid4().hex
+        self.concurrency = concurrency
+        self.rate = rate
+        self.chunk_size = chunk_size
+        self.status = "queued"
+        self.error = None
+        self.processed = 0
+        self.updated = 0
+        self.failed = 0
+        self.resumed_from = None
+        self.started_at = None
+        self.finished_at = None
+
+    @classmethod
+    def from_env(cls, app, job_id=None):
+        return cls(
+            app,
+            concurrency=int(os.getenv("BACKFILL_CONCURRENCY", "8")),
+            rate=float(os.getenv("BACKFILL_RATE", "10")),
+            chunk_size=int(os.getenv("BACKFILL_CHUNK_SIZE", "200")),
+            job_id=job_id
+        )
+
+    @classmethod
+    def from_run(cls, run):
+        """A read-only view of a stored BackfillRun, for status reports."""
+        job = cls(None, job_id=run.id)
+        for field in RUN_FIELDS:
+            setattr(job, field, getattr(run, field))
+        return job
+
+    @property
+    def running(self):
+        return self.status in ("queued", "running")
+
+    def to_dict(self):
+        elapsed = ((self.finished_at or datetime.utcnow()) - self.started_at).total_seconds() if self.started_at else 0.0
+        return {
+            'id': self.id,
+            'status': self.status,
+            'error': self.error,
+            'processed': self.processed,
+            'updated': self.updated,
+            'failed': self.failed,
+            'resumed_from': self.resumed_from,
+            'elapsed_seconds': round(elapsed, 3),
+            'users_per_second': round(self.processed / elapsed, 2) if elapsed else 0.0
+        }
+
+    def _save(self):
+        """Copies progress onto the job's BackfillRun row. Does not commit."""
+        values = {field: getattr(self, field) for field in RUN_FIELDS}
+        db.session.execute(
+            update(BackfillRun).where(BackfillRun.id == self.id).values(heartbeat_at=datetime.utcnow(), **values)
+        )
+
+    def _fetch_name(self, limiter, user_id):
+        limiter.wait()
+        try:
+            user_data = clerk.get_client().get_user(user_id, raise_errors=True)
+        except (requests.RequestException, ValueError) as e:
+            print(f"Backfill: could not fetch {user_id}: {e}")
+            return user_id, None, False
+        return user_id, clerk.full_name(user_data) if user_data else None, True
+
+    def run(self):
+        self.status = "running"
+        self.started_at = datetime.utcnow()
+        with self.app.app_context():
+            try:
+                self._run()
+                self.status = "complete"
+            except Exception as e:
+                db.session.rollback()
+                self.status = "failed"
+                self.error = str(e)
+                print(f"Backfill job {self.id} failed: {e}")
+            finally:
+                self.finished_at = datetime.utcnow()
+                try:
+                    self._save()
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Backfill job {self.id}: could not record its status: {e}")
+
+    def _run(self):
+        checkpoint = db.session.get(BackfillCheckpoint, JOB_NAME)
+        self.resumed_from = checkpoint.last_key
+        last_key = checkpoint.last_key
+        self._save()
+        db.session.commit()
+
+        user_table = User.__table__
+        write_names = update(user_table).where(
+            user_table.c.id == bindparam('user_id'),
+            or_(user_table.c.name.is_(None), user_table.c.name == PLACEHOLDER_NAME)
+        ).values(name=bindparam('new_name'))
+
+        limiter = RateLimiter(self.rate)
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="backfill") as pool:
+            while True:
+                query = select(User.id).where(
+                    or_(User.name.is_(None), User.name == PLACEHOLDER_NAME)
+                ).order_by(User.id).limit(self.chunk_size)
+                if last_key is not None:
+                    query = query.where(User.id > last_key)
+                user_ids = db.session.execute(query).scalars().all()
+                if not user_ids:
+                    break
+
+                names = []
+                failed = 0
+                for user_id, name, ok in pool.map(lambda uid: self._fetch_name(limiter, uid), user_ids):
+                    if not ok:
+                        failed += 1
+                    elif name:
+                        names.append({'user_id': user_id, 'new_name': name})
+
+                if names:
+                    db.session.execute(write_names, names)
+                last_key = user_ids[-1]
+                checkpoint.last_key = last_key
+                checkpoint.updated_at = datetime.utcnow()
+                self.processed += len(user_ids)
+                self.updated += len(names)
+                self.failed += failed
+                self._save()
+                db.session.commit()
+                if names:
+                    events.users_changed()
+
+                print(f"Backfill {self.id}: {self.processed} processed, {self.updated} updated, "
+                      f"{self.to_dict()['users_per_second']} users/s")
+
+        # A finished pass starts from the beginning next time.
+        checkpoint.last_key = None
+        checkpoint.updated_at = datetime.utcnow()
+        db.session.commit()
+
+
+def claim(app):
+    """Claims the backfill for a new run; returns (job, created).
+
+    The checkpoint row is created if missing (ON CONFLICT DO NOTHING, so
+    two workers can't both insert it) and locked while its run_id is
+    checked. If a run is still going, that run is returned instead, from
+    whichever worker started it. A run whose heartbeat is older than
+    BACKFILL_STALE_SECONDS belonged to a worker that died and is marked
+    failed. Must be called inside an app context; commits.
+    """
+    insert = dialect_insert()
+    if insert is not None:
+        db.session.execute(insert(BackfillCheckpoint).values(job=JOB_NAME).on_conflict_do_nothing(index_elements=['job']))
+    elif db.session.get(BackfillCheckpoint, JOB_NAME) is None:
+        db.session.add(BackfillCheckpoint(job=JOB_NAME))
+        db.session.flush()
+    checkpoint = BackfillCheckpoint.query.filter_by(job=JOB_NAME).with_for_update().one()
+
+    now = datetime.utcnow()
+    current = db.session.get(BackfillRun, checkpoint.run_id) if checkpoint.run_id else None
+    if current is not None and current.status in ("queued", "running"):
+        stale_after = timedelta(seconds=int(os.getenv("BACKFILL_STALE_SECONDS", "600")))
+        if current.heartbeat_at and now - current.heartbeat_at < stale_after:
+            job = BackfillJob.from_run(current)
+            db.session.commit()
+            return job, False
+        current.status = "failed"
+        current.error = "Abandoned: no progress reported"
+        current.finished_at = now
+
+    job = BackfillJob.from_env(app)
+    db.session.add(BackfillRun(id=job.id, job=JOB_NAME, status=job.status, heartbeat_at=now))
+    checkpoint.run_id = job.id
+    db.session.query(BackfillRun).filter(BackfillRun.finished_at < now - RETENTION).delete()
+    db.session.commit()
+    return job, True
+
+
+def start(app):
+    """Starts a backfill in a background thread, or returns the running one."""
+    job, created = claim(app)
+    if created:
+        threading.Thread(target=job.run, name=f"backfill-{job.id[:8]}", daemon=True).start()
+    return job
+
+
+def get_job(job_id):
+    run = db.session.get(BackfillRun, job_id)
+    return BackfillJob.from_run(run) if run else None
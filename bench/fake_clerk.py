@@ -0,0 +1,65 @@
+"""A local stand-in for the Clerk Backend API used by the benchmarks.
+
+Answers GET /users/<id> with a generated profile after `latency` seconds,
+so Clerk-bound paths (enrichment, backfill, POST /users) can be measured
+without network noise or rate limits. Ids starting with "missing" get a
+404, like users deleted from Clerk.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeClerk:
+    def __init__(self, latency=0.02):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.calls += 1
+                time.sleep(fake.latency)
+                user_id = self.path.rstrip("/").rsplit("/", 1)[-1]
+                if not self.path.startswith("/users/") or user_id.startswith("missing"):
+                    body = json.dumps({'errors': [{'code': 'resource_not_found'}]}).encode()
+                    self.send_response(404)
+                else:
+                    body = json.dumps({
+                        'id': user_id,
+                        'first_name': "Bench",
+                        'last_name': user_id,
+                        'username': None,
+                        'email_addresses': [{'email_address': f"{user_id}@bench.invalid"}]
+                    }).encode()
+                    self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="fake-clerk", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
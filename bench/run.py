@@ -0,0 +1,394 @@
+"""Benchmarks the main API routes through the WSGI app.
+
+Migrates and seeds a scratch database, points the Clerk client at a
+local fake server, then drives each scenario at fixed concurrency with
+one Flask test client per thread. It reports latency percentiles,
+throughput, SQL statements per request and peak RSS, and writes the
+results to bench/results/<commit>.json so runs can be compared across
+commits:
+
+    python -m bench.run
+    python -m bench.run --users 5000 --projects 100000 --concurrency 16
+    python -m bench.run --database-url postgresql://localhost/lostconnect_bench
+    python -m bench.run --compare bench/results/<baseline>.json
+
+The database must be empty; SQLite runs use a temporary file.
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from bench.fake_clerk import FakeClerk
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("list", "create", "webhook", "backfill", "delete_all")
+WEBHOOK_SECRET = "bench-webhook-secret"
+CATEGORIES = ("human", "animal", "plant")
+WORDS = ("dog", "cat", "wallet", "keys", "brown", "black", "collar", "park", "lake", "phone", "bag", "red")
+
+_local = threading.local()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", help="empty database to use (default: temporary SQLite file)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--projects", type=int, default=20000)
+    parser.add_argument("--placeholder-ratio", type=float, default=0.2,
+                        help="share of users seeded without a name, for the backfill scenario")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--clerk-latency-ms", type=float, default=20.0)
+    parser.add_argument("--cache", action="store_true", help="keep the response cache enabled")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=19)
+    parser.add_argument("--output", help="results file (default: bench/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to print deltas against")
+    return parser.parse_args(argv)
+
+
+def git_revision():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+        dirty = subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"],
+                                        cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def seed(db, args, rng):
+    from sqlalchemy import insert
+
+    import geo
+    from model import Project, User
+    from users import PLACEHOLDER_NAME
+
+    users = []
+    for i in range(args.users):
+        named = rng.random() >= args.placeholder_ratio
+        users.append({'id': f"user_{i}", 'name': f"User {i}" if named else PLACEHOLDER_NAME,
+                      'email': f"user_{i}@bench.invalid"})
+    db.session.execute(insert(User), users)
+
+    now = datetime.utcnow()
+    for start in range(0, args.projects, 5000):
+        rows = []
+        for i in range(start, min(start + 5000, args.projects)):
+            lat, lng = 12.5 + rng.random(), 77.0 + rng.random()
+            date = now - timedelta(minutes=i)
+            rows.append({
+                'title': " ".join(rng.sample(WORDS, 3)),
+                'description': " ".join(rng.sample(WORDS, 6)),
+                'status': rng.choice(("lost", "found")),
+                'category': rng.choice(CATEGORIES),
+                'lat': lat, 'lng': lng, 'geohash': geo.encode(lat, lng),
+                'date': date, 'updated_at': date,
+                'user_id': f"user_{rng.randrange(args.users)}"
+            })
+        db.session.execute(insert(Project), rows)
+    db.session.commit()
+    db.session.execute(db.text("ANALYZE"))
+    db.session.commit()
+    return [user['id'] for user in users if user['name'] != PLACEHOLDER_NAME]
+
+
+def drive(app, make_request, total, concurrency):
+    """Runs `total` requests from `concurrency` threads; returns raw timings."""
+    counter = itertools.count()
+    latencies, queries, errors = [], [], []
+    lock = threading.Lock()
+
+    def worker():
+        client = app.test_client()
+        while True:
+            i = next(counter)
+            if i >= total:
+                return
+            _local.queries = 0
+            start = time.perf_counter()
+            response = make_request(client, i)
+            response.get_data()
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                queries.append(_local.queries)
+                if response.status_code >= 400:
+                    errors.append(response.status_code)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, queries, errors, time.perf_counter() - started
+
+
+def summarize(latencies, queries, errors, wall, concurrency):
+    ordered = sorted(latencies)
+    to_ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'errors': len(errors),
+        'p50_ms': to_ms(percentile(ordered, 0.50)),
+        'p95_ms': to_ms(percentile(ordered, 0.95)),
+        'p99_ms': to_ms(percentile(ordered, 0.99)),
+        'max_ms': to_ms(ordered[-1] if ordered else None),
+        'throughput_rps': round(len(latencies) / wall, 1) if wall else None,
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def signed_webhook(event):
+    body = json.dumps(event).encode()
+    signature = base64.b64encode(hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha256).digest()).decode()
+    return body, signature
+
+
+def wait_for(predicate, timeout=300, interval=0.05):
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > deadline:
+            raise RuntimeError("timed out waiting for background work")
+        time.sleep(interval)
+
+
+def run_scenarios(app, db, args, named_users, rng):
+    from model import User, WebhookEvent
+    from users import PLACEHOLDER_NAME
+
+    results = {}
+    selected = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(selected) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    if "list" in selected:
+        # Spread reads over the first pages instead of hammering one query.
+        client = app.test_client()
+        cursors = [None]
+        for _ in range(19):
+            url = "/projects?limit=50" + (f"&cursor={cursors[-1]}" if cursors[-1] else "")
+            cursor = client.get(url).headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+            cursors.append(cursor)
+
+        def list_request(client, i):
+            cursor = cursors[i % len(cursors)]
+            return client.get("/projects?limit=50" + (f"&cursor={cursor}" if cursor else ""))
+
+        results['list'] = summarize(*drive(app, list_request, args.requests, args.concurrency), args.concurrency)
+
+    if "create" in selected:
+        payloads = []
+        for i in range(args.requests):
+            user_id = rng.choice(named_users)
+            payloads.append({
+                'title': " ".join(rng.sample(WORDS, 3)),
+                'description': " ".join(rng.sample(WORDS, 6)),
+                'status': rng.choice(("lost", "found")),
+                'category': rng.choice(CATEGORIES),
+                'lat': 12.5 + rng.random(), 'lng': 77.0 + rng.random(),
+                'user_id': user_id, 'user_name': f"User {user_id[5:]}"
+            })
+
+        def create_request(client, i):
+            return client.post("/projects", json=payloads[i])
+
+        results['create'] = summarize(*drive(app, create_request, args.requests, args.concurrency), args.concurrency)
+
+    if "webhook" in selected:
+        run_id = int(time.time())
+        deliveries = []
+        for i in range(args.requests):
+            user_id = named_users[i % len(named_users)]
+            deliveries.append(signed_webhook({
+                'type': "user.updated",
+                'data': {'id': user_id, 'first_name': "Webhook", 'last_name': str(i),
+                         'email_addresses': [{'email_address': f"{user_id}@bench.invalid"}]}
+            }))
+
+        def webhook_request(client, i):
+            body, signature = deliveries[i]
+            return client.post("/webhook", data=body, content_type="application/json",
+                               headers={'Clerk-Signature': signature, 'svix-id': f"bench-{run_id}-{i}"})
+
+        summary = summarize(*drive(app, webhook_request, args.requests, args.concurrency), args.concurrency)
+
+        def drained():
+            with app.app_context():
+                pending = WebhookEvent.query.filter(WebhookEvent.processed_at.is_(None)).count()
+                db.session.remove()
+            return pending == 0
+
+        start = time.perf_counter()
+        wait_for(drained)
+        summary['drain_seconds'] = round(time.perf_counter() - start, 3)
+        results['webhook'] = summary
+
+    if "backfill" in selected:
+        with app.app_context():
+            placeholders = User.query.filter(User.name == PLACEHOLDER_NAME).count()
+        client = app.test_client()
+        job = {}
+
+        def backfill_request(client, i):
+            response = client.post("/run-backfill")
+            job.update(response.get_json()['job'])
+            return response
+
+        summary = summarize(*drive(app, backfill_request, 1, 1), 1)
+
+        def finished():
+            job.update(client.get(f"/run-backfill/{job['id']}").get_json())
+            return job['status'] not in ("queued", "running")
+
+        wait_for(finished)
+        summary.update({
+            'users': placeholders,
+            'status': job['status'],
+            'job_seconds': job['elapsed_seconds'],
+            'users_per_second': job['users_per_second'],
+            'peak_rss_mb': peak_rss_mb()
+        })
+        results['backfill'] = summary
+
+    if "delete_all" in selected:
+        def delete_request(client, i):
+            return client.post("/projects/delete-all")
+
+        results['delete_all'] = summarize(*drive(app, delete_request, 1, 1), 1)
+
+    return results
+
+
+def print_results(results, baseline=None):
+    columns = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "queries_per_request", "peak_rss_mb")
+    print(f"{'scenario':<12}" + "".join(f"{column:>22}" for column in columns) + f"{'errors':>8}")
+    for name, summary in results.items():
+        cells = []
+        for column in columns:
+            value = summary.get(column)
+            cell = "-" if value is None else f"{value}"
+            before = ((baseline or {}).get(name) or {}).get(column)
+            if value is not None and before:
+                cell += f" ({(value - before) * 100 / before:+.0f}%)"
+            cells.append(f"{cell:>22}")
+        print(f"{name:<12}" + "".join(cells) + f"{summary['errors']:>8}")
+        extras = {key: summary[key] for key in ('drain_seconds', 'users', 'job_seconds', 'users_per_second')
+                  if key in summary}
+        if extras:
+            print(f"{'':<12}" + ", ".join(f"{key}={value}" for key, value in extras.items()))
+
+
+def main(argv=None):
+    args = parse_args(argv if argv is not None else sys.argv[1:])
+    rng = random.Random(args.seed)
+
+    scratch = None
+    database_url = args.database_url
+    if not database_url:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        database_url = f"sqlite:///{scratch.name}"
+
+    clerk_server = FakeClerk(latency=args.clerk_latency_ms / 1000).start()
+    os.environ.update({
+        'DATABASE_URL': database_url,
+        'CLERK_API_URL': clerk_server.url,
+        'CLERK_SECRET_KEY': "bench",
+        'CLERK_WEBHOOK_SECRET': WEBHOOK_SECRET,
+        'RESPONSE_CACHE_URL': "",
+        'RESPONSE_CACHE_MAX_ENTRIES': os.getenv('RESPONSE_CACHE_MAX_ENTRIES', "1024") if args.cache else "0",
+        'BACKFILL_RATE': os.getenv('BACKFILL_RATE', "1000"),
+        'RATE_LIMIT_ENABLED': "false",
+    })
+
+    sys.path.insert(0, ROOT)
+    from flask_migrate import upgrade
+    from sqlalchemy import event
+
+    from app import app
+    import database
+    from database import db
+    from model import Project
+
+    try:
+        with app.app_context():
+            database.init_migrate(app)
+            upgrade(directory=os.path.join(ROOT, "migrations"))
+            if db.session.query(Project.id).first() is not None:
+                raise SystemExit("The benchmark database already has projects; use an empty one.")
+            started = time.perf_counter()
+            named_users = seed(db, args, rng)
+            seed_seconds = time.perf_counter() - started
+            dialect = db.engine.dialect.name
+
+            @event.listens_for(db.engine, "before_cursor_execute")
+            def count_query(*event_args):
+                _local.queries = getattr(_local, 'queries', 0) + 1
+
+        results = run_scenarios(app, db, args, named_users, rng)
+    finally:
+        clerk_server.stop()
+        if scratch:
+            os.remove(scratch.name)
+
+    report = {
+        'commit': git_revision(),
+        'recorded_at': datetime.utcnow().isoformat(timespec="seconds"),
+        'python': platform.python_version(),
+        'database': dialect,
+        'params': {key: getattr(args, key) for key in ('users', 'projects', 'requests', 'concurrency',
+                                                       'clerk_latency_ms', 'cache', 'seed')},
+        'seed_seconds': round(seed_seconds, 2),
+        'clerk_calls': clerk_server.calls,
+        'results': results
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('params') != report['params']:
+            print("Warning: baseline was recorded with different parameters; deltas are not comparable.")
+        print(f"Comparing {report['commit']} against {baseline.get('commit')}")
+    print_results(results, baseline and baseline.get('results'))
+
+    output = args.output or os.path.join(ROOT, "bench", "results", f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Benchmarks worker startup: import, app creation and first request.
+
+Each sample runs in a fresh interpreter, the way a gunicorn worker
+starts. It records the time to `import app`, to build the app, and to
+serve the first GET /, plus the worker's resident memory. On Linux it
+also forks a worker from the built app, as gunicorn --preload does, and
+records the memory that worker does not share with its parent. Results
+are written to bench/results/startup-<commit>.json:
+
+    python -m bench.startup
+    python -m bench.startup --samples 20
+    python -m bench.startup --compare bench/results/startup-<baseline>.json
+
+--tree measures another checkout with this script, e.g. a baseline made
+with `git worktree add /tmp/baseline <commit>`.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+from bench.run import ROOT, git_revision
+
+COLUMNS = ("import_ms", "create_ms", "first_request_ms", "total_ms", "rss_mb", "forked_private_mb", "modules")
+
+# Runs in the child interpreter with the measured tree as its working directory.
+PROBE = r'''
+import json, os, resource, sys, time
+
+def private_mb():
+    # Pages this process does not share, i.e. what one more worker costs.
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None
+    kb = sum(int(fields[key].split()[0]) for key in ("Private_Clean", "Private_Dirty") if key in fields)
+    return round(kb / 1024, 1)
+
+def rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+sys.path.insert(0, os.getcwd())
+started = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+app = app_module.app
+created = time.perf_counter()
+
+forked_private_mb = None
+if hasattr(os, "fork") and os.path.exists("/proc/self/smaps_rollup"):
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        if getattr(app_module, "_app", None) is not None:
+            import database
+            if hasattr(database, "dispose_after_fork"):
+                database.dispose_after_fork(app)
+        app.test_client().get("/")
+        os.write(write_fd, json.dumps(private_mb()).encode())
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        forked_private_mb = json.loads(pipe.read() or "null")
+    os.waitpid(pid, 0)
+
+before_request = time.perf_counter()
+status = app.test_client().get("/").status_code
+finished = time.perf_counter()
+
+print(json.dumps({
+    'status': status,
+    'import_ms': round((imported - started) * 1000, 1),
+    'create_ms': round((created - imported) * 1000, 1),
+    'first_request_ms': round((finished - before_request) * 1000, 1),
+    'total_ms': round((imported - started + created - imported + finished - before_request) * 1000, 1),
+    'rss_mb': rss_mb(),
+    'forked_private_mb': forked_private_mb,
+    'modules': len(sys.modules),
+}))
+'''
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--tree", default=ROOT, help="checkout to measure (default: this one)")
+    parser.add_argument("--output", help="results file (default: bench/results/startup-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to print deltas against")
+    return parser.parse_args(argv)
+
+
+def sample(tree, env):
+    completed = subprocess.run([sys.executable, "-c", PROBE], cwd=tree, env=env,
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise SystemExit(f"Startup probe failed:\n{completed.stderr}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    if result.pop('status') != 200:
+        raise SystemExit("Startup probe: GET / did not return 200")
+    return result
+
+
+def main(argv=None):
+    args = parse_args(argv if argv is not None else sys.argv[1:])
+    tree = os.path.abspath(args.tree)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        env = dict(os.environ,
+                   DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'startup.db')}",
+                   MEDIA_ROOT=os.path.join(scratch, "media"),
+                   RATE_LIMIT_ENABLED="false")
+        # One unrecorded run compiles bytecode, so samples measure a warm deploy.
+        sample(tree, env)
+        samples = [sample(tree, env) for _ in range(args.samples)]
+
+    medians = {}
+    for column in COLUMNS:
+        values = [s[column] for s in samples if s.get(column) is not None]
+        medians[column] = round(statistics.median(values), 1) if values else None
+
+    commit = git_revision() if tree == ROOT else os.path.basename(tree.rstrip(os.sep))
+    report = {
+        'commit': commit,
+        'recorded_at': datetime.utcnow().isoformat(timespec="seconds"),
+        'python': platform.python_version(),
+        'samples': args.samples,
+        'medians': medians,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Comparing {commit} against {baseline.get('commit')}")
+    print(f"{'median':<20}{'value':>12}")
+    for column in COLUMNS:
+        value = medians[column]
+        cell = "-" if value is None else f"{value}"
+        before = ((baseline or {}).get('medians') or {}).get(column)
+        if value is not None and before:
+            cell += f" ({(value - before) * 100 / before:+.0f}%)"
+        print(f"{column:<20}{cell:>12}")
+
+    output = args.output or os.path.join(ROOT, "bench", "results", f"startup-{commit}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, request
+from sqlalchemy import select, update
+
+from database import db, dialect_insert
+from model import CacheVersion
+from singleflight import SingleFlight
+
+VERSION_KEY = "feed:version"
+CACHED_HEADERS = ("X-Next-Cursor",)
+
+
+class LocalBackend:
+    """In-process LRU backend whose entries expire after their ttl.
+
+    Counters live outside the LRU so a version key can never be evicted
+    and reset to a value older entries were stored under. They are only
+    seen by this process; ResponseCache keeps the feed version in the
+    database instead when this backend is in use.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def incr(self, key):
+        with self._lock:
+            value = self._counters.get(key, 0) + 1
+            self._counters[key] = value
+            return value
+
+
+class DatabaseVersion:
+    """A version counter in the cache_version table, shared by every worker.
+
+    Lets the in-process backend stay correct under several gunicorn
+    workers: a write in one worker bumps the row, and the others see it
+    within max_age seconds, the time a read is reused for.
+    """
+
+    def __init__(self, name, max_age=1.0):
+        self.name = name
+        self.max_age = max_age
+        self._value = 0
+        self._read_at = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._read_at is not None and time.monotonic() - self._read_at < self.max_age:
+                return self._value
+        value = db.session.execute(
+            select(CacheVersion.version).where(CacheVersion.name == self.name)
+        ).scalar() or 0
+        self._remember(value)
+        return value
+
+    def incr(self):
+        """Bumps the counter in its own transaction, leaving the session alone."""
+        table = CacheVersion.__table__
+        with db.engine.begin() as connection:
+            insert = dialect_insert(connection)
+            if insert is not None:
+                stmt = insert(table).values(name=self.name, version=1)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[table.c.name], set_={'version': table.c.version + 1}
+                ).returning(table.c.version)
+                value = connection.execute(stmt).scalar_one()
+            else:
+                updated = connection.execute(
+                    update(table).where(table.c.name == self.name).values(version=table.c.version + 1)
+                ).rowcount
+                if not updated:
+                    connection.execute(table.insert().values(name=self.name, version=1))
+                value = connection.execute(select(table.c.version).where(table.c.name == self.name)).scalar_one()
+        self._remember(value)
+        return value
+
+    def _remember(self, value):
+        with self._lock:
+            self._value = max(self._value, value) if self._read_at is not None else value
+            self._read_at = time.monotonic()
+
+
+class RedisBackend:
+    """Shared backend over any client exposing Redis' get/set/incr.
+
+    Every worker sees the same version counter, so a write in one worker
+    invalidates cached responses in all of them.
+    """
+
+    def __init__(self, client, prefix="lostconnect:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url):
+        import redis
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+
+class ResponseCache:
+    """Versioned cache of JSON GET responses with strong ETags.
+
+    Cache keys embed a global feed version, and every write path calls
+    bump(). That makes every earlier entry unreachable at once, with no
+    need to track which entries a write affects. ETags hash the response
+    body, so a client's validator survives a bump as long as its page
+    didn't actually change.
+    """
+
+    def __init__(self, backend=None, ttl=300):
+        self.backend = backend or LocalBackend()
+        self.ttl = ttl
+        self.shared_version = None
+        self._flights = SingleFlight()
+
+    def init_app(self, app):
+        url = os.getenv("RESPONSE_CACHE_URL")
+        if url:
+            self.backend = RedisBackend.from_url(url)
+            self.shared_version = None
+        else:
+            self.backend = LocalBackend(int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024")))
+            self.shared_version = DatabaseVersion(VERSION_KEY, float(os.getenv("RESPONSE_CACHE_VERSION_MAX_AGE", "1")))
+        self.ttl = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+
+    def version(self):
+        if self.shared_version is not None:
+            return self.shared_version.get()
+        return int(self.backend.get(VERSION_KEY) or 0)
+
+    def bump(self):
+        if self.shared_version is not None:
+            return self.shared_version.incr()
+        return self.backend.incr(VERSION_KEY)
+
+    def _respond(self, entry):
+        response = Response(entry['body'], status=200, mimetype=entry['mimetype'])
+        for name, value in entry['headers'].items():
+            response.headers[name] = value
+        response.set_etag(entry['etag'])
+        return response.make_conditional(request)
+
+    def cached(self, view):
+        """Decorates a GET view so repeat requests skip the view entirely."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+
+            key = f"response:{self.version()}:{request.full_path}"
+            stored = self.backend.get(key)
+            if stored is not None:
+                return self._respond(json.loads(stored))
+
+            # Concurrent misses for one key share a single run of the view.
+            (entry, response), shared = self._flights.do(key, lambda: self._render(key, view, args, kwargs))
+            if entry is not None:
+                return self._respond(entry)
+            return view(*args, **kwargs) if shared else response
+        return wrapper
+
+    def _render(self, key, view, args, kwargs):
+        """Runs the view; returns (entry, None) if cacheable, else (None, response)."""
+        response = view(*args, **kwargs)
+        if isinstance(response, tuple) or response.status_code != 200 or response.is_streamed:
+            return None, response
+
+        body = response.get_data(as_text=True)
+        entry = {
+            'body': body,
+            'etag': hashlib.sha256(body.encode()).hexdigest(),
+            'mimetype': response.mimetype,
+            'headers': {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+        }
+        self.backend.set(key, json.dumps(entry), self.ttl)
+        return entry, None
+
+
+response_cache = ResponseCache()
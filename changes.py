@@ -0,0 +1,100 @@
+import base64
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import joinedload
+
+from database import db
+from model import Project, ProjectTombstone
+from pagination import PaginationError
+
+# Rows younger than this are held back for the next poll, so a transaction
+# that commits slightly after a later-stamped one is not skipped over.
+SAFETY_LAG = timedelta(seconds=2)
+# The in-process indexes (matching, search) track new rows by id, but ids
+# are handed out before commit, so a slow transaction can commit below the
+# high-water mark; each sync also rereads rows updated this recently.
+RESCAN_WINDOW = timedelta(seconds=60)
+MAX_ID = 2 ** 31 - 1
+
+
+def encode_cursor(updated_at, project_id, tombstone_id):
+    raw = f"{updated_at.isoformat()}|{project_id}|{tombstone_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        updated_at, project_id, tombstone_id = raw.split("|")
+        return datetime.fromisoformat(updated_at), int(project_id), int(tombstone_id)
+    except (ValueError, UnicodeDecodeError):
+        raise PaginationError("Invalid cursor")
+
+
+def _head_cursor(horizon):
+    """A cursor positioned after everything visible at `horizon`."""
+    last_tombstone = db.session.query(func.max(ProjectTombstone.id)).scalar() or 0
+    return encode_cursor(horizon, MAX_ID, last_tombstone)
+
+
+def project_changes(cursor, limit):
+    """Returns projects created, updated or deleted after a cursor.
+
+    Without a cursor, or if every project was deleted since the cursor,
+    the result is a reset: the client should reload the full list and
+    continue polling from the returned cursor.
+    """
+    horizon = datetime.utcnow() - SAFETY_LAG
+    if not cursor:
+        return {'reset': True, 'projects': [], 'deleted': [], 'has_more': False, 'cursor': _head_cursor(horizon)}
+
+    updated_at, project_id, tombstone_id = decode_cursor(cursor)
+
+    tombstones = db.session.query(ProjectTombstone.id, ProjectTombstone.project_id).filter(
+        ProjectTombstone.id > tombstone_id
+    ).order_by(ProjectTombstone.id).limit(limit + 1).all()
+    if any(deleted_id is None for _, deleted_id in tombstones):
+        return {'reset': True, 'projects': [], 'deleted': [], 'has_more': False, 'cursor': _head_cursor(horizon)}
+
+    projects = Project.query.options(joinedload(Project.user)).filter(
+        or_(
+            Project.updated_at > updated_at,
+            and_(Project.updated_at == updated_at, Project.id > project_id)
+        ),
+        Project.updated_at <= horizon
+    ).order_by(Project.updated_at, Project.id).limit(limit + 1).all()
+
+    more_projects = len(projects) > limit
+    more_tombstones = len(tombstones) > limit
+    projects = projects[:limit]
+    tombstones = tombstones[:limit]
+
+    if more_projects:
+        updated_at, project_id = projects[-1].updated_at, projects[-1].id
+    elif horizon > updated_at:
+        # Everything up to the horizon has been returned.
+        updated_at, project_id = horizon, MAX_ID
+    if tombstones:
+        tombstone_id = tombstones[-1][0]
+
+    return {
+        'reset': False,
+        'projects': [project.to_dict() for project in projects],
+        'deleted': [deleted_id for _, deleted_id in tombstones],
+        'has_more': more_projects or more_tombstones,
+        'cursor': encode_cursor(updated_at, project_id, tombstone_id)
+    }
+
+
+def record_reset():
+    """Replaces all tombstones with a single reset marker. Does not commit.
+
+    The marker is inserted before older rows are deleted so tombstone ids
+    keep increasing even on SQLite, which reuses ids of an emptied table.
+    """
+    marker = ProjectTombstone(project_id=None)
+    db.session.add(marker)
+    db.session.flush()
+    ProjectTombstone.query.filter(ProjectTombstone.id < marker.id).delete()
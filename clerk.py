@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+
+DEFAULT_API_URL = "https://api.clerk.com/v1"
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a per-entry TTL."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns (hit, value); expired entries count as misses."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def full_name(user_data):
+    """Builds a display name from a Clerk user object, or None if it has none."""
+    first_name = user_data.get("first_name") or ""
+    last_name = user_data.get("last_name") or ""
+    return f"{first_name} {last_name}".strip() or user_data.get("username") or None
+
+
+class ClerkClient:
+    """Clerk Backend API client with a pooled session and a profile cache.
+
+    Found profiles are cached for `ttl` seconds and users Clerk does not
+    know about for `negative_ttl` seconds. Transport errors are never
+    cached, so a Clerk outage doesn't stick once it is over.
+    """
+
+    def __init__(self, api_key, base_url=DEFAULT_API_URL, timeout=(3.05, 5.0),
+                 pool_size=10, cache_size=10000, ttl=3600, negative_ttl=60):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.cache = TTLCache(cache_size)
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+        retries = Retry(total=2, backoff_factor=0.2, status_forcelist=(429, 500, 502, 503, 504),
+                        allowed_methods=frozenset(["GET"]))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retries)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            api_key=os.getenv("CLERK_SECRET_KEY"),
+            base_url=os.getenv("CLERK_API_URL", DEFAULT_API_URL),
+            timeout=(float(os.getenv("CLERK_CONNECT_TIMEOUT", "3.05")), float(os.getenv("CLERK_READ_TIMEOUT", "5"))),
+            pool_size=int(os.getenv("CLERK_POOL_SIZE", "10")),
+            cache_size=int(os.getenv("CLERK_CACHE_SIZE", "10000")),
+            ttl=float(os.getenv("CLERK_CACHE_TTL", "3600")),
+            negative_ttl=float(os.getenv("CLERK_NEGATIVE_CACHE_TTL", "60"))
+        )
+
+    def fetch_user(self, user_id):
+        """Fetches a user from Clerk without the cache.
+
+        Returns the user object, or None if Clerk has no such user. Raises
+        requests.RequestException on transport or server errors.
+        """
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            response = self.session.get(f"{self.base_url}/users/{user_id}", timeout=self.timeout)
+            outcome = str(response.status_code)
+        finally:
+            metrics.observe_clerk(time.perf_counter() - start, outcome)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def get_user(self, user_id, raise_errors=False):
+        """Returns the cached Clerk user object, or None if unavailable.
+
+        With raise_errors, transport and server errors propagate instead of
+        being reported as a missing user, so callers can retry them.
+        """
+        if not user_id:
+            return None
+        hit, user_data = self.cache.get(user_id)
+        if hit:
+            return user_data
+
+        try:
+            user_data = self.fetch_user(user_id)
+        except (requests.RequestException, ValueError) as e:
+            if raise_errors:
+                raise
+            print(f"Clerk fetch error for {user_id}: {e}")
+            return None
+
+        self.cache.set(user_id, user_data, self.ttl if user_data else self.negative_ttl)
+        return user_data
+
+    def get_user_name(self, user_id):
+        """Returns the user's display name, or None if it can't be resolved."""
+        user_data = self.get_user(user_id)
+        return full_name(user_data) if user_data else None
+
+    def invalidate(self, user_id):
+        self.cache.pop(user_id)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Returns the process-wide client, created from the environment on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ClerkClient.from_env()
+    return _client
+
+
+def get_user_name(user_id):
+    return get_client().get_user_name(user_id)
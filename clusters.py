@@ -0,0 +1,196 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import func
+
+import geo
+from database import db
+from model import Project, ProjectTombstone
+
+MAX_PRECISION = 7
+MAX_VIEWPORT_CELLS = 1024
+MAX_CACHED_CELLS = 50000
+
+# Zoom level -> geohash precision used as the clustering grid. Roughly one
+# cell per 64-128px of screen at each zoom.
+ZOOM_PRECISION = [1, 1, 1, 2, 2, 3, 3, 3, 4, 4, 5, 5, 5, 6, 6, 7]
+
+
+def precision_for_zoom(zoom):
+    return ZOOM_PRECISION[max(0, min(zoom, len(ZOOM_PRECISION) - 1))]
+
+
+class ClusterCache:
+    """LRU cache of per-cell aggregates, keyed by geohash cell.
+
+    A cell's precision is its length, so a cell key identifies the zoom
+    band it was computed for. Inserting a report only has to drop the
+    handful of cells that contain it, one per precision. Each worker
+    has its own cache, so sync() runs before serving: like
+    matching.MatchIndex.sync, it reads the projects and tombstones
+    committed since the last call, including those written by other
+    workers. Cells also expire after ttl seconds, which bounds how long
+    any change sync() cannot see (an id committed out of order) can stay
+    hidden.
+    """
+
+    def __init__(self, max_cells=MAX_CACHED_CELLS, ttl=300):
+        self.max_cells = max_cells
+        self.ttl = ttl
+        self._cells = OrderedDict()
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._generation = 0
+        self._last_id = None
+        self._last_tombstone = None
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get_many(self, cells):
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for cell in cells:
+                item = self._cells.get(cell)
+                if item is None:
+                    continue
+                expires, aggregate = item
+                if expires <= now:
+                    del self._cells[cell]
+                    continue
+                self._cells.move_to_end(cell)
+                found[cell] = aggregate
+        return found
+
+    def put_many(self, aggregates, generation):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            # Skip results computed before a concurrent invalidation.
+            if generation != self._generation:
+                return
+            for cell, aggregate in aggregates.items():
+                self._cells[cell] = (expires, aggregate)
+                self._cells.move_to_end(cell)
+            while len(self._cells) > self.max_cells:
+                self._cells.popitem(last=False)
+
+    def invalidate_point(self, geohash):
+        if not geohash:
+            return
+        with self._lock:
+            self._generation += 1
+            for precision in range(1, MAX_PRECISION + 1):
+                self._cells.pop(geohash[:precision], None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._cells.clear()
+
+    def sync(self):
+        """Drops cells touched by projects inserted or deleted since the last sync."""
+        with self._sync_lock:
+            if self._last_id is None:
+                # Nothing cached yet; start from the current high-water marks.
+                self._last_id = db.session.query(func.max(Project.id)).scalar() or 0
+                self._last_tombstone = db.session.query(func.max(ProjectTombstone.id)).scalar() or 0
+                return
+
+            tombstone = db.session.query(func.max(ProjectTombstone.id)).filter(
+                ProjectTombstone.id > self._last_tombstone
+            ).scalar()
+            if tombstone is not None:
+                # A deleted row's cells are unknown, so start over. Ids can
+                # be reused after every project was deleted, hence the reread.
+                self.clear()
+                self._last_tombstone = tombstone
+                self._last_id = db.session.query(func.max(Project.id)).scalar() or 0
+                return
+
+            rows = db.session.query(Project.id, Project.geohash).filter(
+                Project.id > self._last_id
+            ).order_by(Project.id).all()
+            for project_id, geohash in rows:
+                self.invalidate_point(geohash)
+                self._last_id = project_id
+
+
+cache = ClusterCache(ttl=int(os.getenv("CLUSTER_CACHE_TTL", "300")))
+
+
+def _empty_aggregate():
+    return {'count': 0, 'lat_sum': 0.0, 'lng_sum': 0.0, 'status': {}, 'category': {}}
+
+
+def _load_cells(cells, precision, box):
+    """Aggregates every cell in `cells` with a single GROUP BY query."""
+    if len(cells) > geo.MAX_COVER_CELLS:
+        # The viewport covering is coarser than the grid, so every grid cell
+        # it touches is complete in the result.
+        query_cells = geo.cover(*box)
+    else:
+        query_cells = cells
+
+    cell_column = func.substr(Project.geohash, 1, precision)
+    rows = db.session.query(
+        cell_column,
+        Project.status,
+        Project.category,
+        func.count(Project.id),
+        func.sum(Project.lat),
+        func.sum(Project.lng),
+    ).filter(
+        geo.within_cells(Project.geohash, query_cells)
+    ).group_by(cell_column, Project.status, Project.category).all()
+
+    aggregates = {cell: _empty_aggregate() for cell in cells}
+    for cell, status, category, count, lat_sum, lng_sum in rows:
+        category = category or 'uncategorized'
+        aggregate = aggregates.setdefault(cell, _empty_aggregate())
+        aggregate['count'] += count
+        aggregate['lat_sum'] += lat_sum or 0.0
+        aggregate['lng_sum'] += lng_sum or 0.0
+        aggregate['status'][status] = aggregate['status'].get(status, 0) + count
+        aggregate['category'][category] = aggregate['category'].get(category, 0) + count
+    return aggregates
+
+
+def viewport_clusters(min_lat, min_lng, max_lat, max_lng, zoom):
+    """Returns clusters for every non-empty grid cell in a viewport."""
+    box = (min_lat, min_lng, max_lat, max_lng)
+    boxes = geo.split_box(*box)
+    precision = precision_for_zoom(zoom)
+    while precision > 1 and sum(geo.cell_count(*b, precision) for b in boxes) > MAX_VIEWPORT_CELLS:
+        precision -= 1
+
+    cells = set()
+    for b in boxes:
+        cells.update(geo.cells_in_box(*b, precision))
+
+    cache.sync()
+    aggregates = cache.get_many(cells)
+    missing = cells.difference(aggregates)
+    if missing:
+        generation = cache.generation
+        loaded = _load_cells(missing, precision, box)
+        cache.put_many(loaded, generation)
+        aggregates.update((cell, loaded[cell]) for cell in missing)
+
+    clusters = []
+    for cell in sorted(aggregates):
+        aggregate = aggregates[cell]
+        if not aggregate['count']:
+            continue
+        clusters.append({
+            'cell': cell,
+            'count': aggregate['count'],
+            'lat': aggregate['lat_sum'] / aggregate['count'],
+            'lng': aggregate['lng_sum'] / aggregate['count'],
+            'status': aggregate['status'],
+            'category': aggregate['category'],
+        })
+    return {'precision': precision, 'clusters': clusters}
@@ -0,0 +1,21 @@
+from flask import Blueprint, Response, jsonify
+
+import database
+import metrics
+
+bp = Blueprint('core', __name__)
+
+
+@bp.route("/")
+def hello():
+    return "LostConnect backend is running ✅"
+
+
+@bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.instrumentation.render(), mimetype='text/plain; version=0.0.4')
+
+
+@bp.route('/db/pool', methods=['GET'])
+def pool_stats():
+    return jsonify(database.pool_metrics.snapshot())
@@ -1,12 +1,164 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+import click
 import os
+import threading
 
 db = SQLAlchemy()
-migrate = Migrate()
+
+# Per-process pool defaults by gunicorn worker class: (pool_size, max_overflow).
+# A sync worker serves one request at a time; the extra connections are for
+# the enrichment, outbox and backfill threads.
+POOL_DEFAULTS = {
+    'sync': (2, 3),
+    'gthread': (10, 5),
+    'gevent': (10, 10),
+    'eventlet': (10, 10),
+}
+# Connections each worker holds outside the pool: the SSE relay's LISTEN
+# and NOTIFY connections.
+DETACHED_CONNECTIONS = 2
+
+_DIALECT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def dialect_insert(connection=None):
+    """The dialect's insert() supporting ON CONFLICT, or None.
+
+    Looks at the session's bind unless a connection is given.
+    """
+    bind = connection if connection is not None else db.session.get_bind()
+    return _DIALECT_INSERTS.get(bind.dialect.name)
+
+
+def database_url():
+    """DATABASE_URL with Heroku-style postgres:// rewritten for SQLAlchemy."""
+    url = os.getenv('DATABASE_URL')
+    if url and url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(url, statement_timeout=True):
+    """SQLALCHEMY_ENGINE_OPTIONS built from DB_* env vars.
+
+    pool_pre_ping and pool_recycle replace connections the server or a
+    proxy dropped while idle, instead of failing the next request. If
+    DB_MAX_CONNECTIONS is set, the pool is shrunk so that every gunicorn
+    worker together stays under it, keeping DB_RESERVED_CONNECTIONS free
+    for migrations and psql. DB_STATEMENT_TIMEOUT_MS is applied only when
+    statement_timeout is true; CLI commands such as `flask db upgrade`
+    turn it off, since backfills and index builds can run for minutes.
+    """
+    options = {
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() not in ('0', 'false', 'no'),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '300')),
+    }
+    if not url or url.startswith('sqlite'):
+        return options
+
+    worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+    pool_size, max_overflow = POOL_DEFAULTS.get(worker_class, POOL_DEFAULTS['gthread'])
+    if worker_class == 'gthread':
+        pool_size = min(pool_size, int(os.getenv('GUNICORN_THREADS', '32')))
+    pool_size = int(os.getenv('DB_POOL_SIZE', pool_size))
+    max_overflow = int(os.getenv('DB_MAX_OVERFLOW', max_overflow))
+
+    max_connections = os.getenv('DB_MAX_CONNECTIONS')
+    if max_connections:
+        workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+        reserved = int(os.getenv('DB_RESERVED_CONNECTIONS', '5'))
+        budget = max((int(max_connections) - reserved) // workers - DETACHED_CONNECTIONS, 1)
+        if pool_size + max_overflow > budget:
+            print(f"Capping database pool at {budget} connections per worker "
+                  f"({workers} workers, DB_MAX_CONNECTIONS={max_connections})")
+            pool_size = min(pool_size, budget)
+            max_overflow = budget - pool_size
+
+    options.update({
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+    })
+
+    if url.startswith('postgresql'):
+        connect_args = {
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5')),
+            # TCP keepalives notice dead connections before a query hangs on them.
+            'keepalives': 1,
+            'keepalives_idle': 30,
+            'keepalives_interval': 10,
+            'keepalives_count': 3,
+        }
+        timeout_ms = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '30000')) if statement_timeout else 0
+        if timeout_ms:
+            connect_args['options'] = f"-c statement_timeout={timeout_ms}"
+        options['connect_args'] = connect_args
+    return options
+
+
+class PoolMetrics:
+    """Counts pool events for one engine; read with snapshot()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {'connects': 0, 'checkouts': 0, 'invalidations': 0, 'soft_invalidations': 0}
+        self.engine = None
+
+    def attach(self, engine):
+        self.engine = engine
+        event.listen(engine.pool, 'connect', lambda *args: self._count('connects'))
+        event.listen(engine.pool, 'checkout', lambda *args: self._count('checkouts'))
+        event.listen(engine.pool, 'invalidate', lambda *args: self._count('invalidations'))
+        event.listen(engine.pool, 'soft_invalidate', lambda *args: self._count('soft_invalidations'))
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.counters)
+        pool = self.engine.pool if self.engine is not None else None
+        for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+            method = getattr(pool, name, None)
+            stats[name] = method() if method else None
+        return stats
+
+
+pool_metrics = PoolMetrics()
+
 
 def init_app(app):
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
+    url = database_url()
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # `flask db ...` and other CLI commands run inside a click context; web
+    # workers skip importing Alembic and keep the statement timeout.
+    cli = click.get_current_context(silent=True) is not None
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url, statement_timeout=not cli)
     db.init_app(app)
-    migrate.init_app(app, db)
\ No newline at end of file
+    if cli:
+        init_migrate(app)
+    with app.app_context():
+        pool_metrics.attach(db.engine)
+
+
+def init_migrate(app):
+    """Registers Flask-Migrate so the app can run migrations."""
+    from flask_migrate import Migrate
+    Migrate(app, db)
+
+
+def dispose_after_fork(app):
+    """Drops pooled connections inherited from a parent process.
+
+    close=False leaves the parent's sockets alone; the child simply starts
+    with an empty pool and opens its own connections.
+    """
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -0,0 +1,183 @@
+import heapq
+import math
+from datetime import datetime
+
+from flask import Blueprint, jsonify, request
+from sqlalchemy import or_, select, union_all
+from sqlalchemy.orm import joinedload
+
+import clusters
+import geo
+import matching
+import search
+from cache import response_cache
+from database import db
+from model import Project
+from pagination import PaginationError, parse_limit
+
+bp = Blueprint('discovery', __name__)
+
+
+@bp.route('/projects/nearby', methods=['GET'])
+@response_cache.cached
+def nearby_projects():
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        if 'radius_km' in request.args:
+            lat = geo.parse_coordinate(request.args['lat'], 90)
+            lng = geo.parse_coordinate(request.args['lng'], 180)
+            radius_km = float(request.args['radius_km'])
+            if not (math.isfinite(radius_km) and radius_km > 0):
+                raise ValueError
+            if radius_km > geo.MAX_RADIUS_KM:
+                return jsonify({'error': f'radius_km must not exceed {geo.MAX_RADIUS_KM:g}'}), 400
+            box = geo.radius_box(lat, lng, radius_km)
+        else:
+            radius_km = None
+            box = geo.parse_box(*(request.args[key] for key in ('min_lat', 'min_lng', 'max_lat', 'max_lng')))
+    except KeyError:
+        return jsonify({'error': 'Provide lat, lng and radius_km, or min_lat, min_lng, max_lat and max_lng'}), 400
+    except (ValueError, PaginationError):
+        return jsonify({'error': 'Invalid query parameters'}), 400
+
+    min_lat, min_lng, max_lat, max_lng = box
+    if min_lat > max_lat:
+        return jsonify({'error': 'min_lat must not exceed max_lat'}), 400
+
+    filters = [getattr(Project, key) == request.args[key] for key in ('status', 'category') if request.args.get(key)]
+
+    results = []
+    if radius_km is None:
+        results = [project.to_dict() for project in _newest_in_box(box, filters, limit)]
+    else:
+        for distance, project in _nearest_in_radius(lat, lng, radius_km, box, filters, limit):
+            item = project.to_dict()
+            item['distance_km'] = round(distance, 3)
+            results.append(item)
+
+    return jsonify(results)
+
+
+def _nearest_in_radius(lat, lng, radius_km, box, filters, limit):
+    """(distance_km, project) for the `limit` nearest projects, nearest first.
+
+    Candidates come off the geohash index as bare (id, lat, lng) rows; the
+    radius is capped at geo.MAX_RADIUS_KM so their number stays bounded,
+    and only the nearest are loaded in full.
+    """
+    min_lat, min_lng, max_lat, max_lng = box
+    candidates = db.session.execute(select(Project.id, Project.lat, Project.lng).where(
+        geo.within_cells(Project.geohash, geo.cover(*box)),
+        Project.lat.between(min_lat, max_lat),
+        *filters
+    )).all()
+    in_radius = []
+    for row in candidates:
+        distance = geo.haversine_km(lat, lng, row.lat, row.lng)
+        if distance <= radius_km:
+            in_radius.append((distance, row.id))
+    nearest = heapq.nsmallest(limit, in_radius)
+
+    projects = Project.query.options(joinedload(Project.user)).filter(
+        Project.id.in_([project_id for _, project_id in nearest])
+    ).all()
+    by_id = {project.id: project for project in projects}
+    return [(distance, by_id[project_id]) for distance, project_id in nearest if project_id in by_id]
+
+
+def _newest_in_box(box, filters, limit):
+    """The newest `limit` projects inside a bounding box, newest first.
+
+    Each cell of the box's geohash covering contributes at most `limit`
+    ids, read off ix_project_geohash_date, so the rows transferred stay
+    bounded however many projects a zoomed-out box holds. The overall
+    newest are picked from those and only they are loaded in full.
+    """
+    min_lat, min_lng, max_lat, max_lng = box
+    if min_lng <= max_lng:
+        in_lng = Project.lng.between(min_lng, max_lng)
+    else:
+        in_lng = or_(Project.lng >= min_lng, Project.lng <= max_lng)
+
+    per_cell = [
+        select(Project.id, Project.date).where(
+            Project.geohash.between(*geo.prefix_range(cell)),
+            Project.lat.between(min_lat, max_lat),
+            in_lng,
+            *filters
+        ).order_by(Project.date.desc(), Project.id.desc()).limit(limit).subquery()
+        for cell in sorted(geo.cover(*box))
+    ]
+    candidates = db.session.execute(union_all(*[select(part.c.id, part.c.date) for part in per_cell])).all()
+    newest = [row.id for row in heapq.nlargest(limit, candidates, key=lambda row: (row.date or datetime.min, row.id))]
+
+    projects = Project.query.options(joinedload(Project.user)).filter(Project.id.in_(newest)).all()
+    by_id = {project.id: project for project in projects}
+    return [by_id[project_id] for project_id in newest if project_id in by_id]
+
+
+@bp.route('/projects/clusters', methods=['GET'])
+@response_cache.cached
+def project_clusters():
+    try:
+        box = geo.parse_box(*(request.args[key] for key in ('min_lat', 'min_lng', 'max_lat', 'max_lng')))
+        zoom = int(request.args['zoom'])
+    except KeyError:
+        return jsonify({'error': 'min_lat, min_lng, max_lat, max_lng and zoom are required'}), 400
+    except ValueError:
+        return jsonify({'error': 'Invalid query parameters'}), 400
+
+    if box[0] > box[2]:
+        return jsonify({'error': 'min_lat must not exceed max_lat'}), 400
+
+    return jsonify(clusters.viewport_clusters(*box, zoom))
+
+
+@bp.route('/projects/search', methods=['GET'])
+@response_cache.cached
+def search_projects():
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+
+    try:
+        limit = parse_limit(request.args.get('limit'), default=20, maximum=100)
+        offset = int(request.args.get('cursor') or 0)
+        if offset < 0:
+            raise ValueError
+    except (ValueError, PaginationError):
+        return jsonify({'error': 'Invalid query parameters'}), 400
+
+    projects = search.search_projects(
+        query,
+        status=request.args.get('status'),
+        category=request.args.get('category'),
+        limit=limit,
+        offset=offset
+    )
+    response = jsonify([project.to_dict() for project in projects])
+    if len(projects) == limit:
+        response.headers['X-Next-Cursor'] = str(offset + limit)
+    return response
+
+
+@bp.route('/projects/<int:project_id>/matches', methods=['GET'])
+def project_matches(project_id):
+    project = db.session.get(Project, project_id)
+    if not project:
+        return jsonify({'error': 'Project not found'}), 404
+    try:
+        limit = parse_limit(request.args.get('limit'), default=10, maximum=50)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    candidates = matching.find_matches(project, limit)
+    projects = Project.query.options(joinedload(Project.user)).filter(
+        Project.id.in_([candidate_id for _, _, candidate_id in candidates])
+    ).all()
+    by_id = {candidate.id: candidate for candidate in projects}
+    return jsonify([
+        {'score': round(score, 4), 'components': components, 'project': by_id[candidate_id].to_dict()}
+        for score, components, candidate_id in candidates
+        if candidate_id in by_id
+    ])
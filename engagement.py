@@ -0,0 +1,91 @@
+from sqlalchemy import delete, func, select, update
+
+from database import db, dialect_insert
+from model import Comment, Like, Project
+
+MAX_COMMENT_LENGTH = 2000
+
+
+def _adjust(counter, deltas):
+    """Applies {project_id: delta} to a counter column with in-place UPDATEs.
+
+    `counter = counter + delta` is evaluated by the database under the row
+    lock, so concurrent likes never lose an increment.
+    """
+    column = getattr(Project, counter)
+    for project_id, delta in deltas.items():
+        if delta and project_id is not None:
+            db.session.execute(update(Project).where(Project.id == project_id).values({counter: column + delta}))
+
+
+def add_comment(project_id, user_id, content):
+    """Adds a comment and bumps the project's comment_count. Does not commit."""
+    comment = Comment(project_id=project_id, user_id=user_id, content=content)
+    db.session.add(comment)
+    db.session.flush()
+    _adjust('comment_count', {project_id: 1})
+    return comment
+
+
+def delete_comment(comment):
+    """Deletes a comment and decrements its project's count. Does not commit."""
+    if db.session.execute(delete(Comment).where(Comment.id == comment.id)).rowcount:
+        _adjust('comment_count', {comment.project_id: -1})
+
+
+def like(project_id, user_id):
+    """Records a like; returns False if the user already liked the project.
+
+    The unique_like constraint makes repeated or concurrent likes from one
+    user no-ops, so the counter only moves when a row is really inserted.
+    Does not commit.
+    """
+    values = {'project_id': project_id, 'user_id': user_id}
+    insert = dialect_insert()
+    if insert is not None:
+        result = db.session.execute(insert(Like).values(**values).on_conflict_do_nothing(
+            index_elements=['user_id', 'project_id']
+        ))
+        created = result.rowcount == 1
+    elif Like.query.filter_by(**values).first() is None:
+        db.session.add(Like(**values))
+        db.session.flush()
+        created = True
+    else:
+        created = False
+    if created:
+        _adjust('like_count', {project_id: 1})
+    return created
+
+
+def unlike(project_id, user_id):
+    """Removes a like; returns False if there was none. Does not commit."""
+    result = db.session.execute(delete(Like).where(Like.project_id == project_id, Like.user_id == user_id))
+    if result.rowcount:
+        _adjust('like_count', {project_id: -result.rowcount})
+    return bool(result.rowcount)
+
+
+def counts(project_id):
+    return db.session.execute(
+        select(Project.like_count, Project.comment_count).where(Project.id == project_id)
+    ).one()
+
+
+def remove_users(user_ids):
+    """Deletes the likes and comments of users about to be deleted.
+
+    Counters are decremented per project in one pass. Does not commit.
+    """
+    for model, counter in ((Like, 'like_count'), (Comment, 'comment_count')):
+        deltas = dict(db.session.execute(
+            select(model.project_id, -func.count()).where(model.user_id.in_(user_ids)).group_by(model.project_id)
+        ).all())
+        db.session.execute(delete(model).where(model.user_id.in_(user_ids)))
+        _adjust(counter, deltas)
+
+
+def clear_all():
+    """Deletes every like and comment ahead of deleting all projects. Does not commit."""
+    db.session.execute(delete(Like))
+    db.session.execute(delete(Comment))
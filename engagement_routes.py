@@ -0,0 +1,151 @@
+from flask import Blueprint, jsonify, request, send_file
+from sqlalchemy.orm import joinedload
+
+import engagement
+import enrichment
+import events
+import media
+import users
+from database import db
+from model import Comment, Project
+from pagination import PaginationError, keyset_page, parse_limit
+
+bp = Blueprint('engagement', __name__)
+
+
+@bp.route('/projects/<int:project_id>/comments', methods=['GET', 'POST'])
+def project_comments(project_id):
+    if request.method == 'GET':
+        if db.session.get(Project, project_id) is None:
+            return jsonify({'error': 'Project not found'}), 404
+        try:
+            limit = parse_limit(request.args.get('limit'), default=50, maximum=200)
+            comments, next_cursor = keyset_page(
+                Comment.query.options(joinedload(Comment.user)).filter(Comment.project_id == project_id),
+                Comment.created_at, Comment.id,
+                limit, request.args.get('cursor')
+            )
+        except PaginationError as e:
+            return jsonify({'error': str(e)}), 400
+
+        response = jsonify([comment.to_dict() for comment in comments])
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
+
+    data = request.get_json(silent=True) or {}
+    user_id = data.get('user_id')
+    content = (data.get('content') or '').strip()
+    if not user_id or not content:
+        return jsonify({'error': 'user_id and content are required'}), 400
+    if len(content) > engagement.MAX_COMMENT_LENGTH:
+        return jsonify({'error': f'content must be at most {engagement.MAX_COMMENT_LENGTH} characters'}), 400
+    if db.session.get(Project, project_id) is None:
+        return jsonify({'error': 'Project not found'}), 404
+
+    try:
+        stored_name = users.upsert_user(user_id, email=data.get('user_email'), name=data.get('user_name'))
+        comment = engagement.add_comment(project_id, user_id, content)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    events.engagement_changed()
+    if users.needs_name(stored_name):
+        enrichment.enrichment_queue.submit(user_id)
+    return jsonify(comment.to_dict()), 201
+
+
+@bp.route('/projects/<int:project_id>/comments/<int:comment_id>', methods=['DELETE'])
+def delete_project_comment(project_id, comment_id):
+    data = request.get_json(silent=True) or {}
+    user_id = data.get('user_id') or request.args.get('user_id')
+    comment = db.session.get(Comment, comment_id)
+    if comment is None or comment.project_id != project_id:
+        return jsonify({'error': 'Comment not found'}), 404
+    if comment.user_id != user_id:
+        return jsonify({'error': 'Only the author can delete a comment'}), 403
+
+    engagement.delete_comment(comment)
+    db.session.commit()
+    events.engagement_changed()
+    return jsonify({'message': 'Comment deleted'}), 200
+
+
+@bp.route('/projects/<int:project_id>/like', methods=['POST', 'DELETE'])
+def project_like(project_id):
+    data = request.get_json(silent=True) or {}
+    user_id = data.get('user_id') or request.args.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'user_id is required'}), 400
+    if db.session.get(Project, project_id) is None:
+        return jsonify({'error': 'Project not found'}), 404
+
+    try:
+        if request.method == 'POST':
+            users.upsert_user(user_id, email=data.get('user_email'), name=data.get('user_name'))
+            changed = engagement.like(project_id, user_id)
+        else:
+            changed = engagement.unlike(project_id, user_id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    if changed:
+        events.engagement_changed()
+
+    like_count, comment_count = engagement.counts(project_id)
+    return jsonify({'liked': request.method == 'POST', 'like_count': like_count, 'comment_count': comment_count})
+
+
+def _image_state(project):
+    return {
+        'image_hash': project.image_hash,
+        'status': project.image_status,
+        'thumbnail_url': project.thumbnail_url,
+        'image_url': project.image_url
+    }
+
+
+@bp.route('/projects/<int:project_id>/image', methods=['GET', 'POST', 'PUT'])
+def upload_project_image(project_id):
+    project = db.session.get(Project, project_id)
+    if project is None:
+        return jsonify({'error': 'Project not found'}), 404
+    if request.method == 'GET':
+        # Lets clients poll a 'processing' upload until it is 'ready' or 'failed'.
+        return jsonify(_image_state(project))
+    user_id = request.args.get('user_id') or request.form.get('user_id')
+    if user_id != project.user_id:
+        return jsonify({'error': 'Only the creator can change the image'}), 403
+
+    # Raw image bodies are read straight off the socket; multipart
+    # uploads are read from the spooled "image" part.
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('image')
+        if upload is None:
+            return jsonify({'error': 'image file is required'}), 400
+        stream = upload.stream
+    else:
+        stream = request.stream
+
+    try:
+        ready = media.pipeline.attach(project, stream)
+    except media.UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+
+    return jsonify(_image_state(project)), 200 if ready else 202
+
+
+@bp.route('/media/<path:key>', methods=['GET'])
+def media_file(key):
+    try:
+        path = media.pipeline.storage.local_path(key)
+    except ValueError:
+        path = None
+    if path is None:
+        return jsonify({'error': 'Not found'}), 404
+    # Keys are content hashes, so a stored file never changes.
+    response = send_file(path, conditional=True, max_age=31536000)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
@@ -0,0 +1,116 @@
+import os
+import queue
+import random
+import threading
+
+import requests
+from sqlalchemy import or_
+
+import clerk
+import events
+from database import db
+from model import User
+from users import PLACEHOLDER_NAME
+
+
+class EnrichmentQueue:
+    """Fills in placeholder user names from Clerk off the request path.
+
+    Work is a bounded queue of user ids drained by a small pool of daemon
+    threads. Transient Clerk failures are retried with exponential backoff
+    and jitter; anything still unresolved is left as PLACEHOLDER_NAME for
+    the backfill job to pick up later. Threads start on first use so each
+    gunicorn worker gets its own pool after forking.
+    """
+
+    def __init__(self, workers=2, max_size=1000, max_attempts=4, base_delay=0.5):
+        self.workers = workers
+        self.max_size = max_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.app = None
+        self._queue = None
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = int(os.getenv("ENRICHMENT_WORKERS", self.workers))
+        self.max_size = int(os.getenv("ENRICHMENT_QUEUE_SIZE", self.max_size))
+
+    def _start(self):
+        self._queue = queue.Queue(maxsize=self.max_size)
+        self._threads = [
+            threading.Thread(target=self._run, name=f"enrichment-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, user_id, attempt=1):
+        """Queues a user for name enrichment; returns False if it was dropped."""
+        with self._lock:
+            if self._queue is None:
+                self._start()
+            if attempt == 1 and user_id in self._pending:
+                return True
+            try:
+                self._queue.put_nowait((user_id, attempt))
+            except queue.Full:
+                self._pending.discard(user_id)
+                print(f"Enrichment queue full, leaving {user_id} for backfill")
+                return False
+            self._pending.add(user_id)
+            return True
+
+    def _retry_later(self, user_id, attempt):
+        if attempt >= self.max_attempts:
+            print(f"Giving up enriching {user_id} after {attempt} attempts")
+            with self._lock:
+                self._pending.discard(user_id)
+            return
+        delay = self.base_delay * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+        timer = threading.Timer(delay, self.submit, args=(user_id, attempt + 1))
+        timer.daemon = True
+        timer.start()
+
+    def _run(self):
+        while True:
+            user_id, attempt = self._queue.get()
+            try:
+                self._enrich(user_id, attempt)
+            except Exception as e:
+                print(f"Enrichment error for {user_id}: {e}")
+                with self._lock:
+                    self._pending.discard(user_id)
+            finally:
+                self._queue.task_done()
+
+    def _enrich(self, user_id, attempt):
+        try:
+            user_data = clerk.get_client().get_user(user_id, raise_errors=True)
+        except (requests.RequestException, ValueError):
+            self._retry_later(user_id, attempt)
+            return
+
+        name = clerk.full_name(user_data) if user_data else None
+        if name:
+            with self.app.app_context():
+                updated = User.query.filter(
+                    User.id == user_id,
+                    or_(User.name.is_(None), User.name == PLACEHOLDER_NAME)
+                ).update({'name': name}, synchronize_session=False)
+                db.session.commit()
+                if updated:
+                    events.users_changed()
+        with self._lock:
+            self._pending.discard(user_id)
+
+    def join(self):
+        """Blocks until every queued user has been processed once."""
+        if self._queue is not None:
+            self._queue.join()
+
+
+enrichment_queue = EnrichmentQueue()
@@ -0,0 +1,43 @@
+import clusters
+import pubsub
+import search
+from cache import response_cache
+
+
+def projects_created(projects):
+    """Updates derived state and notifies subscribers after projects were committed.
+
+    Items only need the Project column attributes, so bulk inserts can pass
+    lightweight row objects instead of ORM instances.
+    """
+    for project in projects:
+        clusters.cache.invalidate_point(project.geohash)
+        search.project_indexed(project)
+    response_cache.bump()
+    pubsub.broker.publish([pubsub.project_payload(project) for project in projects])
+
+
+def project_created(project):
+    projects_created([project])
+
+
+def projects_cleared():
+    """Resets in-process derived state after every project was deleted."""
+    clusters.cache.clear()
+    search.projects_cleared()
+    response_cache.bump()
+
+
+def users_changed():
+    """Invalidates cached feed responses after user names or emails changed."""
+    response_cache.bump()
+
+
+def engagement_changed():
+    """Invalidates cached feed responses after like or comment counts moved."""
+    response_cache.bump()
+
+
+def projects_updated():
+    """Invalidates cached feed responses after existing projects changed."""
+    response_cache.bump()
@@ -0,0 +1,179 @@
+"""Checks that the hot route queries are served by indexes.
+
+Migrates a scratch database, seeds it, calls each route below through the
+test client while recording the SELECTs it issues, and runs EXPLAIN on
+every one. Exits non-zero if a query falls back to a full scan of a
+table, or if a route's plans no longer mention the index it relies on.
+
+    python explain_check.py                       # temporary SQLite file
+    python explain_check.py postgresql://.../scratch
+
+tests/test_explain.py runs the same checks on SQLite under pytest.
+
+The database is migrated and filled with fake projects, so never point
+this at one that holds real data.
+"""
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+SEED_PROJECTS = 5000
+SEED_USERS = 200
+
+# (name, url, index the route's plans must use or None for "any index")
+CHECKS = [
+    ("list first page", "/projects?limit=50", "ix_project_date_id"),
+    ("list next page", "/projects?limit=50&cursor={cursor}", "ix_project_date_id"),
+    ("nearby box", "/projects/nearby?min_lat=12.9&min_lng=77.5&max_lat=13.0&max_lng=77.6", "ix_project_geohash_date"),
+    ("nearby filtered", "/projects/nearby?min_lat=12.9&min_lng=77.5&max_lat=13.0&max_lng=77.6"
+                        "&status=lost&category=animal", None),
+    ("nearby radius", "/projects/nearby?lat=12.95&lng=77.55&radius_km=3", "ix_project_geohash_date"),
+    ("clusters", "/projects/clusters?min_lat=12.5&min_lng=77.0&max_lat=13.5&max_lng=78.0&zoom=10",
+     "ix_project_geohash_date"),
+    ("changes", "/projects/changes?since={since}", "ix_project_updated_at_id"),
+    ("search", "/projects/search?q=dog&status=lost&category=animal", None),
+    ("matches", "/projects/{project_id}/matches", None),
+    ("comments", "/projects/{project_id}/comments?limit=20", "ix_comment_project_id_created_at"),
+]
+
+SQLITE_SCAN = re.compile(r'\bSCAN (\w+)$')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def seed(db):
+    from model import Comment, Project, User
+
+    rng = random.Random(16)
+    words = ["dog", "cat", "wallet", "keys", "brown", "black", "collar", "park", "lake", "phone", "bag", "red"]
+    now = datetime.utcnow()
+    db.session.execute(User.__table__.insert(), [
+        {'id': f"user_{i}", 'name': f"User {i}", 'email': f"user_{i}@example.com"} for i in range(SEED_USERS)
+    ])
+    rows = []
+    for i in range(SEED_PROJECTS):
+        lat = 12.5 + rng.random()
+        lng = 77.0 + rng.random()
+        date = now - timedelta(days=30, minutes=i)
+        rows.append(Project(
+            title=" ".join(rng.sample(words, 3)),
+            description=" ".join(rng.sample(words, 6)),
+            status=rng.choice(["lost", "found"]),
+            category=rng.choice(["human", "animal", "plant"]),
+            lat=lat, lng=lng, date=date, updated_at=date,
+            user_id=f"user_{rng.randrange(SEED_USERS)}"
+        ))
+    db.session.add_all(rows)
+    db.session.flush()
+    db.session.add_all(
+        Comment(project_id=project.id, user_id=project.user_id, content="seen", created_at=project.date)
+        for project in rows[-200:] for _ in range(5)
+    )
+    db.session.commit()
+    db.session.execute(db.text("ANALYZE"))
+    db.session.commit()
+
+
+def explain(connection, statement, parameters):
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql("SET enable_seqscan = off")
+        plan = connection.exec_driver_sql("EXPLAIN " + statement, parameters).scalars().all()
+        scans = [match.group(1) for line in plan for match in [POSTGRES_SCAN.search(line)] if match]
+    else:
+        plan = [row[-1] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+        scans = [match.group(1) for line in plan for match in [SQLITE_SCAN.search(line.strip())] if match]
+    return plan, scans
+
+
+def run(app):
+    """Migrates and seeds the app's database, then checks every route.
+
+    Returns a list of failure messages; empty when every plan is indexed.
+    tests/test_explain.py runs this against a scratch SQLite file.
+    """
+    from flask_migrate import upgrade
+    from sqlalchemy import event
+
+    import changes
+    from cache import response_cache
+    import database
+    from database import db
+
+    failures = []
+    with app.app_context():
+        database.init_migrate(app)
+        upgrade(directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations"))
+        seed(db)
+
+        client = app.test_client()
+        first = client.get("/projects?limit=50")
+        # In-memory indexes load the whole table once; only steady-state
+        # queries are checked.
+        client.get("/projects/search?q=warmup")
+        client.get("/projects/1/matches")
+        since = changes.encode_cursor(datetime.utcnow() - timedelta(days=31), 0, 0)
+        values = {
+            'cursor': first.headers.get("X-Next-Cursor"),
+            'since': since,
+            'project_id': db.session.execute(db.text("SELECT max(id) FROM project")).scalar()
+        }
+
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT") and not executemany:
+                statements.append((statement, parameters))
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            for name, url, expected in CHECKS:
+                failed = len(failures)
+                statements.clear()
+                response_cache.bump()
+                response = client.get(url.format(**values))
+                if response.status_code != 200:
+                    failures.append(f"{name}: {url} returned {response.status_code}")
+                    continue
+
+                plans = []
+                with db.engine.connect() as connection:
+                    for statement, parameters in list(statements):
+                        plan, scans = explain(connection, statement, parameters)
+                        plans.extend(plan)
+                        for table in scans:
+                            if table in ("project", "user"):
+                                failures.append(f"{name}: full scan of {table}\n    {statement}\n    " +
+                                                "\n    ".join(plan))
+                if expected and not any(expected in line for line in plans):
+                    failures.append(f"{name}: expected {expected}, got\n    " + "\n    ".join(plans))
+                print(f"{'ok  ' if len(failures) == failed else 'FAIL'}  {name}")
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+    return failures
+
+
+def main(database_url=None):
+    scratch = None
+    if not database_url:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        database_url = f"sqlite:///{scratch.name}"
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['RATE_LIMIT_ENABLED'] = "false"
+
+    from app import app
+
+    try:
+        failures = run(app)
+    finally:
+        if scratch:
+            os.remove(scratch.name)
+
+    for failure in failures:
+        print(failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1] if len(sys.argv) > 1 else None))
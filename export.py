@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+
+from sqlalchemy import select
+
+from database import db
+from model import Project, User
+
+EXPORT_BATCH_SIZE = 1000
+LINES_PER_CHUNK = 100
+
+CSV_COLUMNS = [
+    'id', 'title', 'description', 'category', 'status', 'lat', 'lng', 'user_id',
+    'created_at', 'updated_at', 'creator_id', 'creator_name', 'creator_email'
+]
+
+
+def _rows():
+    """Streams flat project rows, creator columns joined in SQL.
+
+    yield_per turns on server-side cursors where the driver supports them
+    (psycopg2 named cursors), so only one batch is ever held in memory.
+    """
+    stmt = select(
+        Project.id, Project.title, Project.description, Project.category, Project.status,
+        Project.lat, Project.lng, Project.user_id, Project.date, Project.updated_at,
+        User.id.label('creator_id'), User.name.label('creator_name'), User.email.label('creator_email')
+    ).outerjoin(User, Project.user_id == User.id).order_by(Project.id)
+    for row in db.session.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE)):
+        yield row
+
+
+def _chunked(lines):
+    """Groups lines into larger writes to cut per-chunk WSGI overhead."""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= LINES_PER_CHUNK:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def ndjson_lines():
+    return _chunked(_ndjson_lines())
+
+
+def _record(row):
+    """One exported project; both formats carry exactly these fields."""
+    return {
+        'id': row.id,
+        'title': row.title,
+        'description': row.description,
+        'category': row.category,
+        'status': row.status,
+        'lat': row.lat,
+        'lng': row.lng,
+        'user_id': row.user_id,
+        'created_at': row.date.isoformat() if row.date else None,
+        'updated_at': row.updated_at.isoformat() if row.updated_at else None,
+        'creator': {
+            'id': row.creator_id,
+            'name': row.creator_name if row.creator_id else "Unknown",
+            'email': row.creator_email if row.creator_id else "Unknown"
+        }
+    }
+
+
+def _ndjson_lines():
+    for row in _rows():
+        yield json.dumps(_record(row)) + "\n"
+
+
+def csv_lines():
+    return _chunked(_csv_lines())
+
+
+def _csv_lines():
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.writerow(CSV_COLUMNS)
+    yield flush()
+    for row in _rows():
+        record = _record(row)
+        creator = record.pop('creator')
+        record.update({'creator_id': creator['id'], 'creator_name': creator['name'], 'creator_email': creator['email']})
+        # csv writes None as an empty cell, the CSV spelling of null.
+        writer.writerow([record[column] for column in CSV_COLUMNS])
+        yield flush()
+
+
+FORMATS = {
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+    'csv': (csv_lines, 'text/csv'),
+}
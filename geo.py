@@ -0,0 +1,185 @@
+import math
+
+from sqlalchemy import or_
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+PRECISION = 9  # ~4.8m x 4.8m cells, stored on Project.geohash
+MAX_COVER_CELLS = 32
+MAX_RADIUS_KM = 100.0  # radius searches scan every report in the covering
+EARTH_RADIUS_KM = 6371.0088
+
+
+def encode(lat, lng, precision=PRECISION):
+    """Encodes a coordinate as a geohash string of the given length."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                bits = (bits << 1) | 1
+                lng_lo = mid
+            else:
+                bits <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_lo = mid
+            else:
+                bits <<= 1
+                lat_hi = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def parse_coordinate(value, limit):
+    """float() of a latitude (limit 90) or longitude (limit 180).
+
+    Raises ValueError for anything that is not a finite number within
+    [-limit, limit], including "nan" and "inf", which float() accepts.
+    """
+    number = float(value)
+    if not math.isfinite(number) or not -limit <= number <= limit:
+        raise ValueError(f"Coordinate out of range: {value!r}")
+    return number
+
+
+def parse_box(min_lat, min_lng, max_lat, max_lng):
+    """Parses a bounding box with parse_coordinate(); raises ValueError."""
+    return (
+        parse_coordinate(min_lat, 90),
+        parse_coordinate(min_lng, 180),
+        parse_coordinate(max_lat, 90),
+        parse_coordinate(max_lng, 180),
+    )
+
+
+def encode_or_none(lat, lng, precision=PRECISION):
+    """Like encode(), but returns None for missing or out-of-range coordinates."""
+    try:
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):  # also rejects nan
+        return None
+    return encode(lat, lng, precision)
+
+
+def cell_size(precision):
+    """Returns the (lat_degrees, lng_degrees) size of a cell at a precision."""
+    total_bits = precision * 5
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def cells_in_box(min_lat, min_lng, max_lat, max_lng, precision):
+    """Yields every geohash cell at a precision intersecting a (non-wrapping) box."""
+    lat_step, lng_step = cell_size(precision)
+    lat_start = math.floor((min_lat + 90) / lat_step)
+    lat_end = math.floor((min(max_lat, 89.999999) + 90) / lat_step)
+    lng_start = math.floor((min_lng + 180) / lng_step)
+    lng_end = math.floor((min(max_lng, 179.999999) + 180) / lng_step)
+    for i in range(lat_start, lat_end + 1):
+        lat = -90 + (i + 0.5) * lat_step
+        for j in range(lng_start, lng_end + 1):
+            lng = -180 + (j + 0.5) * lng_step
+            yield encode(lat, lng, precision)
+
+
+def cell_count(min_lat, min_lng, max_lat, max_lng, precision):
+    """Number of cells cells_in_box() would yield, without encoding them."""
+    lat_step, lng_step = cell_size(precision)
+    rows = math.floor((min(max_lat, 89.999999) + 90) / lat_step) - math.floor((min_lat + 90) / lat_step) + 1
+    cols = math.floor((min(max_lng, 179.999999) + 180) / lng_step) - math.floor((min_lng + 180) / lng_step) + 1
+    return rows * cols
+
+
+def split_box(min_lat, min_lng, max_lat, max_lng):
+    """Splits a bounding box that crosses the antimeridian into two boxes."""
+    if min_lng <= max_lng:
+        return [(min_lat, min_lng, max_lat, max_lng)]
+    return [(min_lat, min_lng, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lng)]
+
+
+def cover(min_lat, min_lng, max_lat, max_lng, max_cells=MAX_COVER_CELLS):
+    """Returns a set of geohash prefixes whose cells cover the bounding box.
+
+    The finest precision that needs at most max_cells cells is chosen, so
+    the covering stays small for any viewport while still pruning most of
+    the table.
+    """
+    boxes = split_box(min_lat, min_lng, max_lat, max_lng)
+    precision = PRECISION
+    while precision > 1:
+        if sum(cell_count(*box, precision) for box in boxes) <= max_cells:
+            break
+        precision -= 1
+
+    cells = set()
+    for box in boxes:
+        cells.update(cells_in_box(*box, precision))
+    return cells
+
+
+def prefix_range(prefix):
+    """Returns the inclusive (low, high) geohash range sharing a prefix."""
+    return prefix, prefix + BASE32[-1] * (PRECISION - len(prefix))
+
+
+def within_cells(column, cells):
+    """SQL clause matching geohash values inside any of the given cells.
+
+    Uses range comparisons rather than LIKE so a plain B-tree index on the
+    column serves the lookup on every backend.
+    """
+    return or_(*[column.between(*prefix_range(cell)) for cell in sorted(cells)])
+
+
+def radius_box(lat, lng, radius_km):
+    """Returns the bounding box around a point that contains the radius."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat = max(lat - dlat, -90.0)
+    max_lat = min(lat + dlat, 90.0)
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        return min_lat, -180.0, max_lat, 180.0
+
+    dlng = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(lat))))
+    if dlng >= 180.0:
+        return min_lat, -180.0, max_lat, 180.0
+    min_lng = lng - dlng
+    max_lng = lng + dlng
+    if min_lng < -180.0:
+        min_lng += 360.0
+    if max_lng > 180.0:
+        max_lng -= 360.0
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two coordinates, in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def in_box(lat, lng, min_lat, min_lng, max_lat, max_lng):
+    """Checks whether a point lies in a (possibly antimeridian-crossing) box."""
+    if not min_lat <= lat <= max_lat:
+        return False
+    if min_lng <= max_lng:
+        return min_lng <= lng <= max_lng
+    return lng >= min_lng or lng <= max_lng
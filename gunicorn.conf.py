@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+
+# gthread workers serve each request on a thread, and an SSE connection on
+# /projects/stream holds its thread while open. pubsub.subscriber_limit()
+# keeps streams to a quarter of the threads so they can't starve ordinary
+# requests: 8 per worker, 16 in total, with the defaults below.
+#
+# For thousands of subscribers set GUNICORN_WORKER_CLASS=gevent. Streams
+# then idle as greenlets. The standard library is patched here, before the
+# app is preloaded, and psycopg2 in post_fork, so database queries yield
+# to other greenlets instead of blocking the worker. CPU-bound work
+# (thumbnails, clustering) still holds the worker while it runs.
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+if worker_class == "gevent":
+    from gevent import monkey
+    monkey.patch_all()
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+keepalive = 75
+
+# Each worker gets its own database pool, sized from the worker class and
+# the DB_* variables read in database.engine_options(). Set
+# DB_MAX_CONNECTIONS to the server's limit to keep workers x pool under it.
+
+# With preload the master imports the app once and workers share its
+# pages copy-on-write, which cuts cold start and per-worker memory. Nothing
+# in create_app() opens a connection or starts a thread (the enrichment,
+# outbox, SSE relay and image pool all start on first use), but the engine
+# still exists in the master, so each worker drops whatever pool it
+# inherited before serving. Set GUNICORN_PRELOAD=false to import per worker.
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() not in ("0", "false", "no")
+
+# Workers write their metrics snapshots here and /metrics sums them, so a
+# scrape covers every worker. Emptied when the server starts.
+os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), f"lostconnect-metrics-{os.getpid()}"))
+
+
+def on_starting(server):
+    shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["METRICS_DIR"])
+
+
+def post_fork(server, worker):
+    import sys
+    if worker_class == "gevent":
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    app_module = sys.modules.get("app")
+    if app_module is not None and app_module._app is not None:
+        import database
+        database.dispose_after_fork(app_module._app)
@@ -0,0 +1,139 @@
+import json
+from types import SimpleNamespace
+
+from sqlalchemy import insert
+
+import enrichment
+import events
+import geo
+import users
+from database import db
+from model import Project, User
+
+BULK_CHUNK_SIZE = 500
+
+
+# Text fields checked against their column lengths before they reach the
+# database, so one oversized value is reported on its own line.
+PROJECT_TEXT_FIELDS = ('title', 'description', 'category', 'status', 'user_id')
+USER_TEXT_FIELDS = {'user_email': User.email, 'user_name': User.name}
+
+
+def _too_long(column, value):
+    length = column.type.length
+    return length is not None and len(value) > length
+
+
+def validate_project(data):
+    """Checks a report payload; returns (fields, None) or (None, error)."""
+    if not isinstance(data, dict):
+        return None, 'Invalid JSON data'
+
+    fields = {key: data.get(key) for key in ('title', 'description', 'category', 'status', 'lat', 'lng', 'user_id')}
+    if not all(fields.values()):
+        return None, 'Missing required fields'
+    for key in PROJECT_TEXT_FIELDS:
+        if not isinstance(fields[key], str):
+            return None, f'{key} must be a string'
+        if _too_long(Project.__table__.c[key], fields[key]):
+            return None, f'{key} is too long'
+    for key, column in USER_TEXT_FIELDS.items():
+        value = data.get(key)
+        if value is not None and (not isinstance(value, str) or _too_long(column, value)):
+            return None, f'Invalid {key}'
+    try:
+        fields['lat'] = geo.parse_coordinate(fields['lat'], 90)
+        fields['lng'] = geo.parse_coordinate(fields['lng'], 180)
+    except (TypeError, ValueError):
+        return None, 'lat and lng must be numbers within -90..90 and -180..180'
+    return fields, None
+
+
+def _flush(pending):
+    """Inserts one chunk of validated lines and yields a result per line.
+
+    If the chunk fails as a whole, its lines are retried one at a time so
+    that only the ones the database rejects are reported as failed.
+    """
+    if not pending:
+        return
+
+    rows = []
+    for _, fields, _ in pending:
+        row = dict(fields)
+        row['geohash'] = geo.encode_or_none(row['lat'], row['lng'])
+        rows.append(row)
+
+    try:
+        stored_names = users.upsert_users([
+            {'id': fields['user_id'], 'email': user.get('email'), 'name': user.get('name')}
+            for _, fields, user in pending
+        ])
+        inserted = db.session.execute(
+            insert(Project).returning(Project.id, Project.date, sort_by_parameter_order=True),
+            rows
+        ).all()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        if len(pending) > 1:
+            # Find the offending lines; the rest of the chunk still goes in.
+            for item in pending:
+                yield from _flush([item])
+            return
+        line_no, _, _ = pending[0]
+        yield {'line': line_no, 'error': str(e)}
+        return
+
+    events.projects_created([
+        SimpleNamespace(id=project_id, date=date, **row)
+        for row, (project_id, date) in zip(rows, inserted)
+    ])
+    for (line_no, _, _), (project_id, _) in zip(pending, inserted):
+        yield {'line': line_no, 'id': project_id}
+
+    for user_id, name in stored_names.items():
+        if users.needs_name(name):
+            enrichment.enrichment_queue.submit(user_id)
+
+
+def ingest_ndjson(lines, chunk_size=BULK_CHUNK_SIZE):
+    """Validates and inserts NDJSON report lines in chunks.
+
+    Yields one result dict per non-blank line as its chunk is committed,
+    then a final summary, so memory stays bounded by chunk_size however
+    long the input is.
+    """
+    counts = {'inserted': 0, 'failed': 0}
+
+    def drain(chunk):
+        for result in _flush(chunk):
+            counts['inserted' if 'id' in result else 'failed'] += 1
+            yield result
+
+    pending = []
+    for line_no, raw in enumerate(lines, 1):
+        raw = raw.strip()
+        if not raw:
+            continue
+
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            error = 'Invalid JSON'
+        else:
+            fields, error = validate_project(data)
+
+        if error:
+            counts['failed'] += 1
+            yield {'line': line_no, 'error': error}
+            continue
+
+        user = {'email': data.get('user_email'), 'name': data.get('user_name')}
+        pending.append((line_no, fields, user))
+        if len(pending) >= chunk_size:
+            yield from drain(pending)
+            pending = []
+
+    yield from drain(pending)
+    yield {'summary': counts}
@@ -0,0 +1,208 @@
+import heapq
+import math
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, or_, select
+
+import geo
+from changes import RESCAN_WINDOW
+from database import db
+from model import Project, ProjectTombstone
+from search import tokenize
+
+CELL_PRECISION = 4  # ~39km x 20km buckets; candidates come from a 3x3 block
+MAX_DISTANCE_KM = 25.0
+MAX_DAYS = 90
+DISTANCE_SCALE_KM = 5.0
+TIME_SCALE_DAYS = 14.0
+WEIGHTS = {'distance': 0.4, 'time': 0.2, 'text': 0.4}
+OPPOSITE_STATUS = {'lost': 'found', 'found': 'lost'}
+
+
+class Entry:
+    __slots__ = ('id', 'lat', 'lng', 'date', 'terms')
+
+    def __init__(self, project_id, lat, lng, date, terms):
+        self.id = project_id
+        self.lat = lat
+        self.lng = lng
+        self.date = date
+        self.terms = terms
+
+
+class MatchIndex:
+    """Lost/found reports bucketed by (category, status, geohash cell).
+
+    Each entry keeps its term frequencies; document frequencies are tracked
+    per category so TF-IDF weights reflect the vocabulary of, say, animal
+    reports rather than the whole table. The index catches up with the
+    database incrementally before each lookup (new ids past the high-water
+    mark, rows updated within RESCAN_WINDOW, new tombstones), so every
+    worker stays current without being notified of writes made elsewhere.
+    It is rebuilt from scratch every rebuild_after seconds, which bounds
+    how long a transaction slower than the window can stay unindexed.
+    Reports older than MAX_DAYS are past matching and are evicted.
+    """
+
+    def __init__(self, rebuild_after=3600):
+        self.rebuild_after = rebuild_after
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._cells = defaultdict(list)
+        self._entries = {}
+        self._keys = {}
+        self._doc_freq = defaultdict(Counter)
+        self._doc_count = Counter()
+        self._by_date = []
+        self._last_id = 0
+        self._last_tombstone = 0
+        self._synced_at = None
+        self._built_at = time.monotonic()
+
+    def _add(self, project_id, title, description, status, category, lat, lng, geohash, date, cutoff):
+        self._last_id = max(self._last_id, project_id)
+        previous = self._entries.get(project_id)
+        self._remove(project_id)  # rescanned or updated rows replace their entry
+        if status not in OPPOSITE_STATUS or not geohash or lat is None or lng is None:
+            return
+        if date is not None and date < cutoff:
+            return
+        terms = Counter(tokenize(title))
+        terms.update(tokenize(description))
+        key = (category, status, geohash[:CELL_PRECISION])
+        entry = Entry(project_id, lat, lng, date, terms)
+        self._cells[key].append(entry)
+        self._entries[project_id] = entry
+        self._keys[project_id] = key
+        self._doc_freq[category].update(terms.keys())
+        self._doc_count[category] += 1
+        if date is not None and (previous is None or previous.date != date):
+            heapq.heappush(self._by_date, (date, project_id))
+
+    def _remove(self, project_id):
+        key = self._keys.pop(project_id, None)
+        if key is None:
+            return
+        entry = self._entries.pop(project_id)
+        self._cells[key].remove(entry)
+        category = key[0]
+        self._doc_freq[category].subtract(entry.terms.keys())
+        self._doc_count[category] -= 1
+
+    def _evict(self, cutoff):
+        while self._by_date and self._by_date[0][0] < cutoff:
+            date, project_id = heapq.heappop(self._by_date)
+            entry = self._entries.get(project_id)
+            if entry is not None and entry.date == date:
+                self._remove(project_id)
+
+    def sync(self):
+        """Applies inserts, updates and deletions committed since the last sync."""
+        with self._lock:
+            if time.monotonic() - self._built_at > self.rebuild_after:
+                self._reset()
+            started = datetime.utcnow()
+            cutoff = started - timedelta(days=MAX_DAYS)
+
+            if self._synced_at is not None:
+                tombstones = db.session.execute(
+                    select(ProjectTombstone.id, ProjectTombstone.project_id)
+                    .where(ProjectTombstone.id > self._last_tombstone)
+                    .order_by(ProjectTombstone.id)
+                ).all()
+                for tombstone_id, project_id in tombstones:
+                    if project_id is None:
+                        self._reset()
+                    else:
+                        self._remove(project_id)
+                    self._last_tombstone = tombstone_id
+
+            if self._synced_at is None:
+                # A full load; earlier tombstones are already reflected in the table.
+                self._last_tombstone = db.session.execute(select(func.max(ProjectTombstone.id))).scalar() or 0
+                self._last_id = db.session.execute(select(func.max(Project.id))).scalar() or 0
+                queries = [(or_(Project.date >= cutoff, Project.date.is_(None)), Project.id)]
+            else:
+                # Two queries rather than an OR, so each is served by its own index.
+                queries = [
+                    (Project.id > self._last_id, Project.id),
+                    (Project.updated_at >= self._synced_at - RESCAN_WINDOW, Project.updated_at),
+                ]
+            for clause, order in queries:
+                rows = db.session.execute(
+                    select(Project.id, Project.title, Project.description, Project.status, Project.category,
+                           Project.lat, Project.lng, Project.geohash, Project.date)
+                    .where(clause)
+                    .order_by(order)
+                    .execution_options(yield_per=1000)
+                )
+                for row in rows:
+                    self._add(*row, cutoff)
+            self._evict(cutoff)
+            self._synced_at = started
+
+    def _weights(self, category, terms):
+        total = self._doc_count[category] or 1
+        doc_freq = self._doc_freq[category]
+        weights = {
+            term: (1 + math.log(count)) * math.log(1 + total / (1 + doc_freq[term]))
+            for term, count in terms.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        return {term: weight / norm for term, weight in weights.items()}
+
+    def candidates(self, project, limit=10):
+        """Returns [(score, components, project_id)] for the best matches."""
+        opposite = OPPOSITE_STATUS.get(project.status)
+        if not opposite or not project.geohash or project.lat is None or project.lng is None:
+            return []
+
+        lat_step, lng_step = geo.cell_size(CELL_PRECISION)
+        cells = {
+            geo.encode_or_none(project.lat + dlat * lat_step, ((project.lng + dlng * lng_step + 180) % 360) - 180,
+                               CELL_PRECISION)
+            for dlat in (-1, 0, 1) for dlng in (-1, 0, 1)
+        }
+
+        terms = Counter(tokenize(project.title))
+        terms.update(tokenize(project.description))
+
+        with self._lock:
+            query_weights = self._weights(project.category, terms)
+            results = []
+            for cell in cells:
+                for entry in self._cells.get((project.category, opposite, cell), ()):
+                    distance = geo.haversine_km(project.lat, project.lng, entry.lat, entry.lng)
+                    if distance > MAX_DISTANCE_KM:
+                        continue
+                    days = abs((project.date - entry.date).total_seconds()) / 86400 if project.date and entry.date else 0.0
+                    if days > MAX_DAYS:
+                        continue
+
+                    entry_weights = self._weights(project.category, entry.terms)
+                    text = sum(weight * entry_weights.get(term, 0.0) for term, weight in query_weights.items())
+                    components = {
+                        'distance': math.exp(-distance / DISTANCE_SCALE_KM),
+                        'time': math.exp(-days / TIME_SCALE_DAYS),
+                        'text': text
+                    }
+                    score = sum(WEIGHTS[name] * value for name, value in components.items())
+                    components['distance_km'] = round(distance, 3)
+                    results.append((score, components, entry.id))
+
+        results.sort(key=lambda result: (-result[0], result[2]))
+        return results[:limit]
+
+
+index = MatchIndex(rebuild_after=int(os.getenv("MATCH_INDEX_REBUILD_SECONDS", "3600")))
+
+
+def find_matches(project, limit=10):
+    index.sync()
+    return index.candidates(project, limit)
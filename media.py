@@ -0,0 +1,293 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import update
+
+import events
+from database import db
+from model import Project
+
+CHUNK_SIZE = 64 * 1024
+VARIANT_SIZES = {
+    'thumb': (320, 320),
+    'web': (1280, 1280),
+}
+# Leading bytes of the formats we accept, mapped to the stored extension.
+SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+
+CONTENT_TYPES = {'jpg': "image/jpeg", 'png': "image/png", 'gif': "image/gif", 'webp': "image/webp"}
+
+
+class UploadError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def sniff_extension(head):
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def original_key(digest, extension):
+    return f"originals/{digest[:2]}/{digest}.{extension}"
+
+
+def variant_key(digest, name):
+    return f"variants/{digest[:2]}/{digest}/{name}.jpg"
+
+
+class LocalStorage:
+    """Stores blobs under a directory; served by the /media route."""
+
+    def __init__(self, root, base_url="/media"):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(os.path.abspath(self.root) + os.sep):
+            raise ValueError("Invalid media key")
+        return path
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def save(self, key, fileobj, content_type):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write aside and rename, so readers never see a partial file.
+        fd, partial = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                shutil.copyfileobj(fileobj, out, CHUNK_SIZE)
+            os.replace(partial, path)
+        except BaseException:
+            os.unlink(partial)
+            raise
+
+    def delete(self, key):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, key):
+        path = self._path(key)
+        return path if os.path.exists(path) else None
+
+    def url(self, key):
+        return f"{self.base_url}/{key}"
+
+
+class S3Storage:
+    """Stores blobs in an S3-compatible bucket (AWS, R2, MinIO, ...).
+
+    Objects are content-addressed and never change, so they are written
+    with a year-long immutable Cache-Control and served straight from the
+    bucket or a CDN in front of it.
+    """
+
+    def __init__(self, client, bucket, public_url):
+        self.client = client
+        self.bucket = bucket
+        self.public_url = public_url.rstrip("/")
+
+    @classmethod
+    def from_env(cls):
+        import boto3
+        bucket = os.getenv("MEDIA_S3_BUCKET")
+        client = boto3.client("s3", endpoint_url=os.getenv("MEDIA_S3_ENDPOINT_URL") or None)
+        return cls(client, bucket, os.getenv("MEDIA_PUBLIC_URL") or f"https://{bucket}.s3.amazonaws.com")
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def save(self, key, fileobj, content_type):
+        self.client.upload_fileobj(fileobj, self.bucket, key, ExtraArgs={
+            'ContentType': content_type,
+            'CacheControl': "public, max-age=31536000, immutable"
+        })
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def local_path(self, key):
+        return None
+
+    def url(self, key):
+        return f"{self.public_url}/{key}"
+
+
+class MediaPipeline:
+    """Accepts uploads on the request thread, resizes them in a process pool.
+
+    The request only streams the body to a temporary file while hashing
+    it, checks that Pillow can parse it, and stores the original under its
+    SHA-256. Thumbnail and web
+    variants are rendered by worker processes, since decoding and
+    resampling are CPU-bound. The results are written to storage and set
+    on every project that uses the image. A hash that already has variants
+    is attached immediately, and identical uploads in flight share one job.
+    Project.image_status tracks each upload: 'processing', then 'ready' or
+    'failed', in which case the original is removed from storage again.
+    """
+
+    def __init__(self, storage=None, max_bytes=10 * 1024 * 1024, workers=2):
+        self.storage = storage
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.app = None
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        if os.getenv("MEDIA_S3_BUCKET"):
+            self.storage = S3Storage.from_env()
+        else:
+            root = os.getenv("MEDIA_ROOT") or os.path.join(app.instance_path, "media")
+            self.storage = LocalStorage(root, os.getenv("MEDIA_PUBLIC_URL") or "/media")
+        self.max_bytes = int(os.getenv("MEDIA_MAX_BYTES", self.max_bytes))
+        self.workers = int(os.getenv("MEDIA_WORKERS", self.workers))
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: forking a threaded web worker can copy held locks.
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def urls(self, digest):
+        return self.storage.url(variant_key(digest, 'thumb')), self.storage.url(variant_key(digest, 'web'))
+
+    def receive(self, stream):
+        """Streams an upload to a temporary file; returns (path, sha256, extension)."""
+        digest = hashlib.sha256()
+        size = 0
+        head = b""
+        fd, path = tempfile.mkstemp(prefix="upload-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadError(f"Image larger than {self.max_bytes} bytes", 413)
+                    if len(head) < 16:
+                        head += chunk[:16]
+                    digest.update(chunk)
+                    out.write(chunk)
+            extension = sniff_extension(head)
+            if size == 0:
+                raise UploadError("Empty upload")
+            if extension is None:
+                raise UploadError("Unsupported image type; use JPEG, PNG, GIF or WebP", 415)
+            import thumbnails
+            try:
+                thumbnails.check_image(path)
+            except ValueError as e:
+                raise UploadError(str(e), 415)
+        except BaseException:
+            os.unlink(path)
+            raise
+        return path, digest.hexdigest(), extension
+
+    def attach(self, project, stream):
+        """Stores an upload for a project; returns True once its variants exist.
+
+        Commits the project's image_hash. Raises UploadError for bad input.
+        """
+        path, digest, extension = self.receive(stream)
+        handed_off = False
+        try:
+            key = original_key(digest, extension)
+            if not self.storage.exists(key):
+                with open(path, "rb") as f:
+                    self.storage.save(key, f, CONTENT_TYPES[extension])
+
+            if project.image_hash != digest:
+                # Never pair the new hash with the previous image's variants.
+                project.thumbnail_url = project.image_url = None
+            project.image_hash = digest
+            ready = all(self.storage.exists(variant_key(digest, name)) for name in VARIANT_SIZES)
+            if ready:
+                project.thumbnail_url, project.image_url = self.urls(digest)
+            project.image_status = 'ready' if ready else 'processing'
+            db.session.commit()
+            if ready:
+                events.projects_updated()
+                return True
+
+            with self._lock:
+                if digest in self._pending:
+                    return False
+                self._pending.add(digest)
+            import thumbnails
+            future = self._get_executor().submit(thumbnails.render_variants, path, VARIANT_SIZES)
+            handed_off = True
+            future.add_done_callback(lambda done: self._store_variants(done, path, digest, key))
+            return False
+        finally:
+            if not handed_off:
+                os.unlink(path)
+
+    def _store_variants(self, future, path, digest, key):
+        try:
+            variants = future.result()
+            for name, data in variants.items():
+                self.storage.save(variant_key(digest, name), io.BytesIO(data), "image/jpeg")
+        except Exception as e:
+            print(f"Image processing failed for {digest}: {e}")
+            variants = None
+        finally:
+            # Released before the UPDATE: a project committed with this hash
+            # after that point resubmits instead of being left without URLs.
+            with self._lock:
+                self._pending.discard(digest)
+            os.unlink(path)
+
+        if variants:
+            thumbnail_url, image_url = self.urls(digest)
+            values = {'thumbnail_url': thumbnail_url, 'image_url': image_url, 'image_status': 'ready'}
+        else:
+            values = {'image_status': 'failed'}
+            try:
+                self.storage.delete(key)
+            except Exception as e:
+                print(f"Could not delete original {key}: {e}")
+        try:
+            with self.app.app_context():
+                db.session.execute(update(Project).where(Project.image_hash == digest).values(**values))
+                db.session.commit()
+                events.projects_updated()
+        except Exception as e:
+            print(f"Could not attach image {digest}: {e}")
+
+
+pipeline = MediaPipeline()
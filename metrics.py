@@ -0,0 +1,372 @@
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+import database
+from database import db
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        """JSON-serialisable [labels, bucket_counts, sum, count] rows."""
+        with self._lock:
+            return [[list(labels), list(counts), total, count] for labels, (counts, total, count) in self._series.items()]
+
+    def render(self, snapshots=None):
+        """Exposition lines summing `snapshots` (default: this process's)."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        merged = {}
+        for snapshot in snapshots if snapshots is not None else [self.snapshot()]:
+            for labels, counts, total, count in snapshot:
+                series = merged.setdefault(tuple(labels), [[0] * len(self.buckets), 0.0, 0])
+                series[0] = [a + b for a, b in zip(series[0], counts)]
+                series[1] += total
+                series[2] += count
+        for labels, (counts, total, count) in sorted(merged.items()):
+            base = list(zip(self.label_names, labels))
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{{{_label_text(base + [('le', bound)])}}} {bucket_count}")
+            lines.append(f"{self.name}_bucket{{{_label_text(base + [('le', '+Inf')])}}} {count}")
+            suffix = f"{{{_label_text(base)}}}" if base else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+class CounterMetric:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._values = Counter()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+    def render(self, snapshots=None):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        merged = Counter()
+        for snapshot in snapshots if snapshots is not None else [self.snapshot()]:
+            for labels, value in snapshot:
+                merged[tuple(labels)] += value
+        for labels, value in sorted(merged.items()):
+            suffix = f"{{{_label_text(zip(self.label_names, labels))}}}" if labels else ""
+            lines.append(f"{self.name}{suffix} {value}")
+        return lines
+
+
+request_seconds = Histogram("http_request_duration_seconds", "Request latency by route.",
+                            ("method", "route", "status"))
+request_queries = Histogram("http_request_sql_queries", "SQL statements issued per request.",
+                            ("route",), QUERY_COUNT_BUCKETS)
+request_sql_seconds = Histogram("http_request_sql_seconds", "Time spent in SQL per request.", ("route",))
+sql_statements = CounterMetric("sql_statements_total", "SQL statements executed, by kind.", ("kind",))
+slow_queries = CounterMetric("sql_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS.", ())
+n_plus_one = CounterMetric("sql_n_plus_one_total", "Requests that repeated one SELECT too often.", ("route",))
+clerk_seconds = Histogram("clerk_request_duration_seconds", "Clerk API call latency.", ("outcome",))
+slow_requests = CounterMetric("http_slow_requests_total", "Requests slower than PROFILE_SLOW_REQUEST_MS.",
+                              ("route",))
+METRICS = (request_seconds, request_queries, request_sql_seconds, sql_statements, slow_queries,
+           n_plus_one, clerk_seconds, slow_requests)
+
+
+def observe_clerk(seconds, outcome):
+    clerk_seconds.observe(seconds, outcome)
+
+
+class SamplingProfiler:
+    """Samples the stacks of in-flight requests every `interval` seconds.
+
+    Stacks are collected per request thread; when a request turns out to
+    be slower than `threshold` its most frequent stacks are logged, so a
+    slow endpoint can be diagnosed from production logs without a
+    profiler attached.
+    """
+
+    def __init__(self, threshold, interval=0.01, top=5):
+        self.threshold = threshold
+        self.interval = interval
+        self.top = top
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def begin(self):
+        samples = Counter()
+        with self._lock:
+            self._active[threading.get_ident()] = samples
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+
+    def end(self, route, elapsed):
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if samples is None or elapsed < self.threshold:
+            return
+        total = sum(samples.values()) or 1
+        stacks = "".join(f"\n  {count * 100 / total:5.1f}%  {stack}" for stack, count in samples.most_common(self.top))
+        logger.warning("Slow request %s took %.0fms; top sampled stacks:%s", route, elapsed * 1000, stacks)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = dict(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for thread_id, samples in active.items():
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None and len(stack) < 12:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                samples[" <- ".join(stack)] += 1
+
+
+def pool_samples():
+    """(name, type, help, value) samples for this process's database pool."""
+    pool = database.pool_metrics.snapshot()
+    return [
+        ('db_pool_size', 'gauge', 'Configured pool size.', pool['size']),
+        ('db_pool_checked_out', 'gauge', 'Connections currently in use.', pool['checkedout']),
+        ('db_pool_overflow', 'gauge', 'Connections open beyond pool_size.', pool['overflow']),
+        ('db_pool_connects_total', 'counter', 'New database connections opened.', pool['connects']),
+        ('db_pool_invalidations_total', 'counter', 'Connections discarded as dead.', pool['invalidations'])
+    ]
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Instrumentation:
+    """Request, SQL and Clerk timings, served as /metrics.
+
+    Metrics are collected per worker process. With METRICS_DIR set (the
+    gunicorn config sets one up), every worker writes a snapshot there
+    every METRICS_FLUSH_SECONDS and /metrics sums them all, so a scrape
+    sees the whole server whichever worker answers it. The answering
+    worker writes its own snapshot before reading the directory, so no
+    worker's numbers ever go back between scrapes. Files of workers that
+    exited are kept, so their counts stay in the totals; their gauges are
+    dropped.
+    """
+
+    def __init__(self):
+        self.n_plus_one_threshold = 10
+        self.slow_query_seconds = 0.2
+        self.profiler = None
+        self.metrics_dir = None
+        self.flush_seconds = 5.0
+        self._flusher = None
+        self._flusher_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.n_plus_one_threshold = int(os.getenv("N_PLUS_ONE_THRESHOLD", self.n_plus_one_threshold))
+        self.slow_query_seconds = float(os.getenv("SLOW_QUERY_MS", self.slow_query_seconds * 1000)) / 1000
+        slow_request_ms = os.getenv("PROFILE_SLOW_REQUEST_MS")
+        if slow_request_ms:
+            self.profiler = SamplingProfiler(float(slow_request_ms) / 1000)
+        self.metrics_dir = os.getenv("METRICS_DIR") or None
+        self.flush_seconds = float(os.getenv("METRICS_FLUSH_SECONDS", self.flush_seconds))
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        with app.app_context():
+            event.listen(db.engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(db.engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _start_flusher(self):
+        with self._flusher_lock:
+            if self._flusher is None:
+                os.makedirs(self.metrics_dir, exist_ok=True)
+                self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning("Could not write metrics snapshot: %s", e)
+            time.sleep(self.flush_seconds)
+
+    def snapshot(self):
+        snapshot = {metric.name: metric.snapshot() for metric in METRICS}
+        snapshot['extra'] = [[name, metric_type, value] for name, metric_type, _, value in pool_samples()]
+        return snapshot
+
+    def flush(self):
+        """Writes this worker's metrics to METRICS_DIR/<pid>.json."""
+        # Serialised, so an older snapshot never replaces a newer one.
+        with self._write_lock:
+            snapshot = self.snapshot()
+            fd, partial = tempfile.mkstemp(dir=self.metrics_dir, prefix=".metrics-")
+            with os.fdopen(fd, "w") as out:
+                json.dump(snapshot, out)
+            os.replace(partial, os.path.join(self.metrics_dir, f"{os.getpid()}.json"))
+
+    def _worker_snapshots(self):
+        """(pid, snapshot) for every worker that wrote to METRICS_DIR."""
+        snapshots = []
+        for filename in os.listdir(self.metrics_dir):
+            pid, extension = os.path.splitext(filename)
+            if extension != ".json" or not pid.isdigit():
+                continue
+            try:
+                with open(os.path.join(self.metrics_dir, filename)) as f:
+                    snapshots.append((int(pid), json.load(f)))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def _before_request(self):
+        if self.metrics_dir and self._flusher is None:
+            self._start_flusher()
+        g.metrics_start = time.perf_counter()
+        g.sql_count = 0
+        g.sql_seconds = 0.0
+        g.sql_selects = Counter()
+        g.metrics_recorded = False
+        if self.profiler:
+            self.profiler.begin()
+
+    def _route(self):
+        return request.url_rule.rule if request.url_rule else "unmatched"
+
+    def _record(self, status):
+        if "metrics_start" not in g or g.metrics_recorded:
+            return
+        g.metrics_recorded = True
+        elapsed = time.perf_counter() - g.metrics_start
+        route = self._route()
+        request_seconds.observe(elapsed, request.method, route, status)
+        request_queries.observe(g.sql_count, route)
+        request_sql_seconds.observe(g.sql_seconds, route)
+
+        if g.sql_selects:
+            statement, count = g.sql_selects.most_common(1)[0]
+            if count > self.n_plus_one_threshold:
+                n_plus_one.inc(route)
+                logger.warning("Possible N+1 on %s %s: %d similar SELECTs: %s",
+                               request.method, route, count, statement[:200])
+
+        if self.profiler:
+            if elapsed >= self.profiler.threshold:
+                slow_requests.inc(route)
+            self.profiler.end(route, elapsed)
+
+    def _after_request(self, response):
+        self._record(response.status_code)
+        return response
+
+    def _teardown_request(self, exc):
+        self._record(500)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_start
+        kind = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        sql_statements.inc(kind)
+        if elapsed >= self.slow_query_seconds:
+            slow_queries.inc()
+            logger.warning("Slow query (%.0fms): %s", elapsed * 1000, _WHITESPACE.sub(' ', statement)[:500])
+
+        if has_request_context() and "sql_count" in g:
+            g.sql_count += 1
+            g.sql_seconds += elapsed
+            if kind == "SELECT":
+                g.sql_selects[statement] += 1
+
+    def render(self):
+        """Prometheus text exposition, summed over every worker's snapshot."""
+        if self.metrics_dir:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            self.flush()
+            snapshots = self._worker_snapshots()
+        else:
+            snapshots = [(os.getpid(), self.snapshot())]
+
+        lines = []
+        for metric in METRICS:
+            lines.extend(metric.render([snapshot.get(metric.name, []) for _, snapshot in snapshots]))
+
+        extra = pool_samples()
+        totals = {name: None for name, _, _, _ in extra}
+        for pid, snapshot in snapshots:
+            for name, metric_type, value in snapshot.get('extra', []):
+                # A gauge of a worker that has exited no longer exists.
+                if value is None or name not in totals or (metric_type == 'gauge' and not _alive(pid)):
+                    continue
+                totals[name] = (totals[name] or 0) + value
+        for name, metric_type, help_text, _ in extra:
+            if totals[name] is None:
+                continue
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}", f"{name} {totals[name]}"])
+        return "\n".join(lines) + "\n"
+
+
+instrumentation = Instrumentation()
@@ -0,0 +1,29 @@
+"""Add backfill checkpoint
+
+Revision ID: 2554ab0e1d87
+Revises: 7d3b5e0a1f62
+Create Date: 2026-10-17 12:03:55.204117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2554ab0e1d87'
+down_revision = '7d3b5e0a1f62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('backfill_checkpoint',
+    sa.Column('job', sa.String(length=50), nullable=False),
+    sa.Column('last_key', sa.String(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('job')
+    )
+
+
+def downgrade():
+    op.drop_table('backfill_checkpoint')
@@ -0,0 +1,42 @@
+"""Add project geohash
+
+Revision ID: 28e9fc43527e
+Revises: c82a9e10bab9
+Create Date: 2026-10-17 09:12:04.118302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import geo
+
+
+# revision identifiers, used by Alembic.
+revision = '28e9fc43527e'
+down_revision = 'c82a9e10bab9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('geohash', sa.String(length=12), nullable=True))
+        batch_op.create_index(batch_op.f('ix_project_geohash'), ['geohash'], unique=False)
+
+    # Backfill existing reports so they show up in /projects/nearby.
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT id, lat, lng FROM project WHERE lat IS NOT NULL AND lng IS NOT NULL"
+    )).fetchall()
+    updates = [
+        {'id': row.id, 'geohash': geo.encode_or_none(row.lat, row.lng)}
+        for row in rows
+    ]
+    if updates:
+        bind.execute(sa.text("UPDATE project SET geohash = :geohash WHERE id = :id"), updates)
+
+
+def downgrade():
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_project_geohash'))
+        batch_op.drop_column('geohash')
@@ -0,0 +1,30 @@
+"""Add project image hash and thumbnail url
+
+Revision ID: 4d8f2a6c1e93
+Revises: e3a7c9d15b20
+Create Date: 2026-10-17 17:12:40.951827
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d8f2a6c1e93'
+down_revision = 'e3a7c9d15b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('thumbnail_url', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('image_hash', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_project_image_hash'), ['image_hash'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_project_image_hash'))
+        batch_op.drop_column('image_hash')
+        batch_op.drop_column('thumbnail_url')
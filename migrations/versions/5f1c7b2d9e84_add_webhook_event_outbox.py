@@ -0,0 +1,37 @@
+"""Add webhook event outbox
+
+Revision ID: 5f1c7b2d9e84
+Revises: ca4861a6e5e2
+Create Date: 2026-10-17 15:02:37.418265
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f1c7b2d9e84'
+down_revision = 'ca4861a6e5e2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('webhook_event',
+    sa.Column('id', sa.String(length=100), nullable=False),
+    sa.Column('event_type', sa.String(length=50), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=True),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('received_at', sa.DateTime(), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('webhook_event', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_webhook_event_processed_at'), ['processed_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('webhook_event', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_webhook_event_processed_at'))
+
+    op.drop_table('webhook_event')
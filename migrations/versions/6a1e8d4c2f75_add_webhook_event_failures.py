@@ -0,0 +1,28 @@
+"""Add webhook event failure columns
+
+Revision ID: 6a1e8d4c2f75
+Revises: 4d8f2a6c1e93
+Create Date: 2026-10-17 19:24:11.530418
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a1e8d4c2f75'
+down_revision = '4d8f2a6c1e93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('webhook_event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('failed_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('error', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('webhook_event', schema=None) as batch_op:
+        batch_op.drop_column('error')
+        batch_op.drop_column('failed_at')
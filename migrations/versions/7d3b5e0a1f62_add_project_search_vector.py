@@ -0,0 +1,39 @@
+"""Add project search vector
+
+Revision ID: 7d3b5e0a1f62
+Revises: 28e9fc43527e
+Create Date: 2026-10-17 10:41:27.530914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3b5e0a1f62'
+down_revision = '28e9fc43527e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Full-text search is native on Postgres only; other backends use the
+    # in-process index in search.py.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute(
+        "ALTER TABLE project ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+        ") STORED"
+    )
+    op.create_index('ix_project_search_vector', 'project', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('ix_project_search_vector', table_name='project')
+    op.drop_column('project', 'search_vector')
@@ -0,0 +1,28 @@
+"""Add cache version table
+
+Revision ID: 8c4b0e7f3a21
+Revises: 6a1e8d4c2f75
+Create Date: 2026-10-17 19:51:02.114857
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4b0e7f3a21'
+down_revision = '6a1e8d4c2f75'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cache_version',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('cache_version')
@@ -0,0 +1,30 @@
+"""Add project access indexes
+
+Revision ID: 9b2e4f6a1c37
+Revises: 5f1c7b2d9e84
+Create Date: 2026-10-17 15:41:09.226413
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b2e4f6a1c37'
+down_revision = '5f1c7b2d9e84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.create_index('ix_project_date_id', ['date', 'id'], unique=False)
+        batch_op.create_index('ix_project_status_category_date', ['status', 'category', 'date'], unique=False)
+        batch_op.create_index(batch_op.f('ix_project_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_project_user_id'))
+        batch_op.drop_index('ix_project_status_category_date')
+        batch_op.drop_index('ix_project_date_id')
@@ -0,0 +1,28 @@
+"""Replace the project geohash index with geohash, date, id
+
+Revision ID: b71f3c9e4d08
+Revises: 8c4b0e7f3a21
+Create Date: 2026-10-17 20:16:45.208733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b71f3c9e4d08'
+down_revision = '8c4b0e7f3a21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.create_index('ix_project_geohash_date', ['geohash', 'date', 'id'], unique=False)
+        batch_op.drop_index(batch_op.f('ix_project_geohash'))
+
+
+def downgrade():
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_project_geohash'), ['geohash'], unique=False)
+        batch_op.drop_index('ix_project_geohash_date')
@@ -0,0 +1,39 @@
+"""Add project updated_at and tombstones
+
+Revision ID: ca4861a6e5e2
+Revises: 2554ab0e1d87
+Create Date: 2026-10-17 14:26:10.771853
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ca4861a6e5e2'
+down_revision = '2554ab0e1d87'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_project_updated_at_id', ['updated_at', 'id'], unique=False)
+
+    op.execute("UPDATE project SET updated_at = date")
+
+    op.create_table('project_tombstone',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('project_tombstone')
+
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.drop_index('ix_project_updated_at_id')
+        batch_op.drop_column('updated_at')
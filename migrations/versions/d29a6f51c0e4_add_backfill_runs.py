@@ -0,0 +1,42 @@
+"""Add backfill runs
+
+Revision ID: d29a6f51c0e4
+Revises: b71f3c9e4d08
+Create Date: 2026-10-17 20:48:30.672195
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd29a6f51c0e4'
+down_revision = 'b71f3c9e4d08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('backfill_run',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('job', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('processed', sa.Integer(), nullable=False),
+    sa.Column('updated', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('resumed_from', sa.String(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('backfill_checkpoint', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('run_id', sa.String(length=32), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('backfill_checkpoint', schema=None) as batch_op:
+        batch_op.drop_column('run_id')
+
+    op.drop_table('backfill_run')
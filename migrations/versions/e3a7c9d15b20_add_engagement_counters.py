@@ -0,0 +1,43 @@
+"""Add project engagement counters
+
+Revision ID: e3a7c9d15b20
+Revises: 9b2e4f6a1c37
+Create Date: 2026-10-17 16:28:51.604317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a7c9d15b20'
+down_revision = '9b2e4f6a1c37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('like_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute('UPDATE project SET like_count = (SELECT count(*) FROM "like" WHERE "like".project_id = project.id), '
+               'comment_count = (SELECT count(*) FROM comment WHERE comment.project_id = project.id)')
+
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.create_index('ix_comment_project_id_created_at', ['project_id', 'created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('like', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_like_project_id'), ['project_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('like', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_like_project_id'))
+
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.drop_index('ix_comment_project_id_created_at')
+
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.drop_column('comment_count')
+        batch_op.drop_column('like_count')
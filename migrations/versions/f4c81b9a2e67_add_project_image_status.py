@@ -0,0 +1,28 @@
+"""Add project image status
+
+Revision ID: f4c81b9a2e67
+Revises: d29a6f51c0e4
+Create Date: 2026-10-17 21:36:12.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4c81b9a2e67'
+down_revision = 'd29a6f51c0e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('image_status', sa.String(length=16), nullable=True))
+
+    op.execute("UPDATE project SET image_status = 'ready' WHERE image_url IS NOT NULL")
+
+
+def downgrade():
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.drop_column('image_status')
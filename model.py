@@ -1,5 +1,6 @@
 from database import db
 from datetime import datetime
+import geo
 
 class User(db.Model):
     id = db.Column(db.String, primary_key=True)  # Clerk user ID
@@ -9,6 +10,35 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     projects = db.relationship('Project', backref='user', lazy=True)
 
+class BackfillCheckpoint(db.Model):
+    job = db.Column(db.String(50), primary_key=True)
+    last_key = db.Column(db.String)  # last user id committed by the job
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    run_id = db.Column(db.String(32))  # latest BackfillRun; locked to claim the job
+
+class BackfillRun(db.Model):
+    id = db.Column(db.String(32), primary_key=True)
+    job = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False)  # queued, running, complete or failed
+    error = db.Column(db.Text)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    updated = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    resumed_from = db.Column(db.String)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # bumped with every chunk; a stale one means the worker died
+
+class WebhookEvent(db.Model):
+    id = db.Column(db.String(100), primary_key=True)  # svix-id, used to drop redeliveries
+    event_type = db.Column(db.String(50), nullable=False)
+    user_id = db.Column(db.String)
+    payload = db.Column(db.Text, nullable=False)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime, index=True)
+    failed_at = db.Column(db.DateTime)  # set when the event failed on its own; skipped from then on
+    error = db.Column(db.Text)
+
 class Project(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
@@ -17,6 +47,104 @@ class Project(db.Model):
     category = db.Column(db.String(20))  # 'human', 'animal', 'plant'
     lat = db.Column(db.Float)
     lng = db.Column(db.Float)
-    image_url = db.Column(db.Text)
+    geohash = db.Column(db.String(12))
+    image_url = db.Column(db.Text)  # web-sized variant; see media.py
+    thumbnail_url = db.Column(db.Text)
+    image_hash = db.Column(db.String(64), index=True)  # sha256 of the uploaded original
+    image_status = db.Column(db.String(16))  # 'processing', 'ready' or 'failed'
     date = db.Column(db.DateTime, default=datetime.utcnow)
-    user_id = db.Column(db.String, db.ForeignKey('user.id'))
\ No newline at end of file
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    user_id = db.Column(db.String, db.ForeignKey('user.id'), index=True)
+    # Maintained by engagement.py in the same transaction as the rows they count.
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        db.Index('ix_project_date_id', 'date', 'id'),
+        # Serves every geohash range lookup, and newest-first per cell in /projects/nearby.
+        db.Index('ix_project_geohash_date', 'geohash', 'date', 'id'),
+        db.Index('ix_project_status_category_date', 'status', 'category', 'date'),
+        db.Index('ix_project_updated_at_id', 'updated_at', 'id'),
+    )
+
+    def to_dict(self):
+        creator = self.user
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'category': self.category,
+            'status': self.status,
+            'lat': self.lat,
+            'lng': self.lng,
+            'user_id': self.user_id,
+            'created_at': self.date.isoformat() if self.date else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'image_url': self.image_url,
+            'thumbnail_url': self.thumbnail_url,
+            'image_status': self.image_status,
+            'like_count': self.like_count or 0,
+            'comment_count': self.comment_count or 0,
+            'creator': {
+                'id': creator.id if creator else None,
+                'name': creator.name if creator else "Unknown",
+                'email': creator.email if creator else "Unknown"
+            }
+        }
+
+class Comment(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    content = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    user_id = db.Column(db.String, db.ForeignKey('user.id'))
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'))
+    user = db.relationship('User')
+
+    __table_args__ = (
+        db.Index('ix_comment_project_id_created_at', 'project_id', 'created_at', 'id'),
+    )
+
+    def to_dict(self):
+        author = self.user
+        return {
+            'id': self.id,
+            'project_id': self.project_id,
+            'content': self.content,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'user': {
+                'id': self.user_id,
+                'name': author.name if author else "Unknown"
+            }
+        }
+
+class Like(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String, db.ForeignKey('user.id'))
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'project_id', name='unique_like'),
+    )
+
+class CacheVersion(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)  # bumped by every write the cache depends on
+
+
+class ProjectTombstone(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer)  # NULL marks a reset: every project was deleted
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+@db.event.listens_for(Project, 'before_insert')
+@db.event.listens_for(Project, 'before_update')
+def _set_geohash(mapper, connection, project):
+    project.geohash = geo.encode_or_none(project.lat, project.lng)
+
+
+@db.event.listens_for(Project, 'after_delete')
+def _record_tombstone(mapper, connection, project):
+    connection.execute(ProjectTombstone.__table__.insert().values(
+        project_id=project.id, deleted_at=datetime.utcnow()
+    ))
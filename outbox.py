@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, update
+
+import clerk
+import engagement
+import events
+import users
+from database import db, dialect_insert
+from model import Project, User, WebhookEvent
+
+USER_EVENTS = ("user.created", "user.updated", "user.deleted")
+RETENTION = timedelta(days=7)
+
+
+def event_id(headers, payload):
+    """Clerk's svix-id identifies a delivery across retries; hash as fallback."""
+    return headers.get("svix-id") or hashlib.sha256(payload).hexdigest()
+
+
+def enqueue(delivery_id, event):
+    """Stores a webhook event unless it was seen before; returns True if new.
+
+    Commits, so the event is durable before the webhook is acknowledged.
+    """
+    row = {
+        'id': delivery_id,
+        'event_type': event.get("type") or "",
+        'user_id': (event.get("data") or {}).get("id"),
+        'payload': json.dumps(event),
+        'received_at': datetime.utcnow()
+    }
+    insert = dialect_insert()
+    if insert is not None:
+        result = db.session.execute(insert(WebhookEvent).values(**row).on_conflict_do_nothing(index_elements=['id']))
+        created = result.rowcount == 1
+    elif db.session.get(WebhookEvent, delivery_id) is None:
+        db.session.add(WebhookEvent(**row))
+        created = True
+    else:
+        created = False
+    db.session.commit()
+    return created
+
+
+def _user_fields(event):
+    user_data = event.get("data") or {}
+    email_addresses = user_data.get("email_addresses", [])
+    email = email_addresses[0]['email_address'] if email_addresses else None
+    # Get first and last names from the webhook data
+    first_name = user_data.get("first_name") or ""
+    last_name = user_data.get("last_name") or ""
+    return {'id': user_data.get("id"), 'email': email, 'name': f"{first_name} {last_name}".strip()}
+
+
+def _apply(pending):
+    """Applies events to the user table and marks them processed.
+
+    Events are coalesced per user id first: only the latest event for each
+    user is applied, so a burst of updates to one account costs a single
+    write. Returns the user ids touched. Does not commit.
+    """
+    latest = {}
+    for webhook_event in pending:
+        if webhook_event.event_type in USER_EVENTS and webhook_event.user_id:
+            latest[webhook_event.user_id] = webhook_event
+
+    upserts = []
+    deletes = []
+    for user_id, webhook_event in latest.items():
+        if webhook_event.event_type == "user.deleted":
+            deletes.append(user_id)
+        else:
+            upserts.append(_user_fields(json.loads(webhook_event.payload)))
+
+    if upserts:
+        users.upsert_users(upserts, overwrite_email=True)
+    if deletes:
+        engagement.remove_users(deletes)
+        # Projects outlive their creator, shown as "Unknown".
+        db.session.execute(
+            update(Project).where(Project.user_id.in_(deletes))
+            .values(user_id=None, updated_at=datetime.utcnow())
+        )
+        db.session.execute(delete(User).where(User.id.in_(deletes)))
+
+    now = datetime.utcnow()
+    for webhook_event in pending:
+        webhook_event.processed_at = now
+    return list(latest)
+
+
+def _pending_query():
+    return WebhookEvent.query.filter(
+        WebhookEvent.processed_at.is_(None),
+        WebhookEvent.failed_at.is_(None)
+    ).order_by(WebhookEvent.received_at, WebhookEvent.id)
+
+
+def _changed(user_ids):
+    for user_id in user_ids:
+        clerk.get_client().invalidate(user_id)
+    if user_ids:
+        events.users_changed()
+
+
+def process_pending(batch_size=500):
+    """Applies one batch of queued events; returns how many were consumed.
+
+    On Postgres the batch is claimed with SKIP LOCKED, letting several
+    workers drain the queue at once. If the batch fails, its events are
+    retried one at a time and any event that still fails is marked with
+    failed_at and its error, so it cannot hold up the events behind it.
+    """
+    pending = _pending_query().limit(batch_size).with_for_update(skip_locked=True).all()
+    if not pending:
+        return 0
+    delivery_ids = [webhook_event.id for webhook_event in pending]
+
+    try:
+        user_ids = _apply(pending)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Webhook batch of {len(delivery_ids)} failed, retrying one at a time: {e}")
+        for delivery_id in delivery_ids:
+            _process_one(delivery_id)
+        return len(delivery_ids)
+
+    _changed(user_ids)
+    return len(delivery_ids)
+
+
+def _process_one(delivery_id):
+    webhook_event = _pending_query().filter(
+        WebhookEvent.id == delivery_id
+    ).with_for_update(skip_locked=True).first()
+    if webhook_event is None:
+        return
+    try:
+        user_ids = _apply([webhook_event])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Webhook event {delivery_id} failed: {e}")
+        db.session.execute(
+            update(WebhookEvent).where(WebhookEvent.id == delivery_id)
+            .values(failed_at=datetime.utcnow(), error=str(e)[:2000])
+        )
+        db.session.commit()
+        return
+    _changed(user_ids)
+
+
+def purge_processed():
+    """Drops processed events past the redelivery window. Commits."""
+    WebhookEvent.query.filter(WebhookEvent.processed_at < datetime.utcnow() - RETENTION).delete()
+    db.session.commit()
+
+
+class OutboxWorker:
+    """Background thread draining the webhook outbox in coalesced batches.
+
+    The thread starts with the first request a process serves (after the
+    gunicorn fork), so events left behind by a crash or restart are picked
+    up without waiting for a new webhook. wake() is called after each
+    enqueue; the worker waits batch_delay seconds so a burst of deliveries
+    lands in one batch, and also polls every poll_interval seconds to pick
+    up events stored by other processes.
+    """
+
+    def __init__(self, batch_delay=0.25, poll_interval=5.0, batch_size=500):
+        self.app = None
+        self.batch_delay = batch_delay
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._wake = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_delay = float(os.getenv("WEBHOOK_BATCH_DELAY", self.batch_delay))
+        self.poll_interval = float(os.getenv("WEBHOOK_POLL_INTERVAL", self.poll_interval))
+        self.batch_size = int(os.getenv("WEBHOOK_BATCH_SIZE", self.batch_size))
+        app.before_request(self.start)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="webhook-outbox", daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        self.start()
+        self._wake.set()
+
+    def _run(self):
+        last_purge = datetime.min
+        self._wake.set()  # drain whatever is already queued right away
+        while True:
+            if self._wake.wait(self.poll_interval):
+                threading.Event().wait(self.batch_delay)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    while process_pending(self.batch_size) == self.batch_size:
+                        pass
+                    if datetime.utcnow() - last_purge > timedelta(hours=1):
+                        purge_processed()
+                        last_purge = datetime.utcnow()
+            except Exception as e:
+                print(f"Webhook outbox error: {e}")
+                with self.app.app_context():
+                    db.session.rollback()
+
+
+worker = OutboxWorker()
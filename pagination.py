@@ -0,0 +1,61 @@
+import base64
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def parse_limit(value, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    """Parses a ?limit= query value, clamping it to [1, maximum]."""
+    if value in (None, ""):
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise PaginationError("limit must be an integer")
+    return max(1, min(limit, maximum))
+
+
+def encode_cursor(date, row_id):
+    """Encodes a (date, id) keyset position as an opaque URL-safe token."""
+    raw = f"{date.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Decodes a token produced by encode_cursor back into (date, id)."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        date_part, id_part = raw.rsplit("|", 1)
+        return datetime.fromisoformat(date_part), int(id_part)
+    except (ValueError, UnicodeDecodeError):
+        raise PaginationError("Invalid cursor")
+
+
+def keyset_page(query, date_column, id_column, limit, cursor=None):
+    """Applies newest-first keyset pagination on (date, id) to a query.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    One extra row is fetched to tell whether another page exists, so the
+    cost of a page never depends on how deep into the table it is.
+    """
+    if cursor:
+        date, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            date_column < date,
+            and_(date_column == date, id_column < row_id),
+        ))
+
+    rows = query.order_by(date_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, date_column.key), getattr(last, id_column.key))
@@ -0,0 +1,149 @@
+import io
+import json
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from sqlalchemy.orm import joinedload
+
+import changes
+import engagement
+import enrichment
+import events
+import export
+import geo
+import ingest
+import pubsub
+import users
+from cache import response_cache
+from database import db
+from model import Project
+from pagination import PaginationError, keyset_page, parse_limit
+
+bp = Blueprint('projects', __name__)
+
+
+@bp.route('/projects', methods=['GET', 'POST'])
+@response_cache.cached
+def projects():
+    if request.method == 'GET':
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            projects, next_cursor = keyset_page(
+                Project.query.options(joinedload(Project.user)),
+                Project.date, Project.id,
+                limit, request.args.get('cursor')
+            )
+        except PaginationError as e:
+            return jsonify({'error': str(e)}), 400
+
+        response = jsonify([project.to_dict() for project in projects])
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
+
+    elif request.method == 'POST':
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'Invalid JSON data'}), 400
+
+        fields, error = ingest.validate_project(data)
+        if error:
+            return jsonify({'error': error}), 400
+
+        user_id = fields['user_id']
+        user_email = data.get('user_email')
+        user_name = data.get('user_name') # <-- Get the name from the request
+        new_project = Project(**fields)
+
+        try:
+            # User and project go in one transaction. Names we don't have
+            # yet are filled in from Clerk by the enrichment queue.
+            stored_name = users.upsert_user(user_id, email=user_email, name=user_name)
+            db.session.add(new_project)
+            db.session.commit()
+            events.project_created(new_project)
+            if users.needs_name(stored_name):
+                enrichment.enrichment_queue.submit(user_id)
+            return jsonify({'message': 'Project added successfully', 'id': new_project.id}), 201
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/projects/bulk', methods=['POST'])
+def bulk_projects():
+    # One JSON report per line in, one result per line out, streamed as
+    # each chunk commits.
+    results = ingest.ingest_ndjson(io.BufferedReader(request.stream, buffer_size=65536))
+    body = (json.dumps(result) + "\n" for result in results)
+    return Response(stream_with_context(body), mimetype='application/x-ndjson')
+
+
+@bp.route('/projects/export', methods=['GET'])
+def export_projects():
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in export.FORMATS:
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+
+    lines, mimetype = export.FORMATS[export_format]
+    response = Response(stream_with_context(lines()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=projects.{export_format}'
+    return response
+
+
+@bp.route('/projects/changes', methods=['GET'])
+def project_changes():
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        return jsonify(changes.project_changes(request.args.get('since'), limit))
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@bp.route('/projects/stream', methods=['GET'])
+def project_stream():
+    box = None
+    if 'min_lat' in request.args:
+        try:
+            box = geo.parse_box(*(request.args[key] for key in ('min_lat', 'min_lng', 'max_lat', 'max_lng')))
+        except (KeyError, ValueError):
+            return jsonify({'error': 'Invalid bounding box'}), 400
+    categories = set(request.args.getlist('category')) or None
+    statuses = set(request.args.getlist('status')) or None
+
+    subscription = pubsub.broker.subscribe(box, categories, statuses)
+    if subscription is None:
+        return jsonify({'error': 'Too many subscribers, retry later'}), 503
+
+    def events_stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                payloads, resync = subscription.wait(timeout=15)
+                if resync:
+                    # Events were dropped; the client should refetch via /projects/changes.
+                    yield "event: resync\ndata: {}\n\n"
+                for payload in payloads:
+                    yield f"id: {payload['id']}\nevent: project\ndata: {json.dumps(payload)}\n\n"
+                if not payloads and not resync:
+                    yield ": keepalive\n\n"
+        finally:
+            pubsub.broker.unsubscribe(subscription)
+
+    response = Response(events_stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@bp.route('/projects/delete-all', methods=['POST'])
+def delete_all_projects():
+    try:
+        engagement.clear_all()
+        num_deleted = Project.query.delete()
+        changes.record_reset()
+        db.session.commit()
+        events.projects_cleared()
+        return jsonify({'message': f'{num_deleted} projects deleted'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
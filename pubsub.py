@@ -0,0 +1,230 @@
+import json
+import os
+import select
+import threading
+from collections import deque
+
+import geo
+from database import db
+
+CHANNEL = "project_events"
+# Postgres caps NOTIFY payloads at 8000 bytes.
+MAX_NOTIFY_BYTES = 7500
+
+
+def project_payload(project):
+    """The event body pushed to subscribers when a project is created."""
+    return {
+        'id': project.id,
+        'title': project.title,
+        'description': project.description,
+        'category': project.category,
+        'status': project.status,
+        'lat': project.lat,
+        'lng': project.lng,
+        'user_id': project.user_id,
+        'created_at': project.date.isoformat() if project.date else None
+    }
+
+
+class Subscription:
+    """One SSE client: a filter plus a bounded buffer of pending events.
+
+    When the buffer is full the oldest event is dropped and the
+    subscription is flagged, so the client can be told to resync instead
+    of silently missing reports.
+    """
+
+    def __init__(self, box=None, categories=None, statuses=None, max_buffer=100):
+        self.box = box
+        self.categories = categories
+        self.statuses = statuses
+        self._events = deque(maxlen=max_buffer)
+        self._condition = threading.Condition()
+        self._overflowed = False
+
+    def matches(self, payload):
+        if self.categories and payload.get('category') not in self.categories:
+            return False
+        if self.statuses and payload.get('status') not in self.statuses:
+            return False
+        if self.box:
+            if payload.get('lat') is None or payload.get('lng') is None:
+                return False
+            return geo.in_box(payload['lat'], payload['lng'], *self.box)
+        return True
+
+    def push(self, payload):
+        with self._condition:
+            if len(self._events) == self._events.maxlen:
+                self._overflowed = True
+            self._events.append(payload)
+            self._condition.notify()
+
+    def wait(self, timeout):
+        """Returns (events, resync) once something arrives or timeout passes."""
+        with self._condition:
+            if not self._events and not self._overflowed:
+                self._condition.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            resync, self._overflowed = self._overflowed, False
+            return events, resync
+
+
+class PostgresRelay:
+    """Carries events between worker processes over LISTEN/NOTIFY.
+
+    Every worker listens on CHANNEL with one dedicated connection, detached
+    from the SQLAlchemy pool, and fans incoming events out to its own
+    subscribers. Publishing sends NOTIFYs on a second dedicated connection,
+    packing several events into each one.
+    """
+
+    def __init__(self, app, on_events):
+        self.app = app
+        self.on_events = on_events
+        self._notify_lock = threading.Lock()
+        self._notify_conn = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _connect(self):
+        with self.app.app_context():
+            connection = db.engine.raw_connection()
+        connection.detach()
+        dbapi = connection.driver_connection
+        dbapi.autocommit = True
+        return dbapi
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._listen, name="sse-relay", daemon=True)
+                self._thread.start()
+
+    def _listen(self):
+        while True:
+            try:
+                conn = self._connect()
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                while True:
+                    if select.select([conn], [], [], 30) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self.on_events(json.loads(notify.payload))
+            except Exception as e:
+                print(f"SSE relay listener error, reconnecting: {e}")
+                threading.Event().wait(1)
+
+    def _batches(self, payloads):
+        batch, size = [], 2
+        for payload in payloads:
+            encoded = json.dumps(payload)
+            if len(encoded) > MAX_NOTIFY_BYTES:
+                payload = dict(payload, description=None)
+                encoded = json.dumps(payload)
+            if batch and size + len(encoded) + 1 > MAX_NOTIFY_BYTES:
+                yield batch
+                batch, size = [], 2
+            batch.append(payload)
+            size += len(encoded) + 1
+        if batch:
+            yield batch
+
+    def notify(self, payloads):
+        with self._notify_lock:
+            try:
+                if self._notify_conn is None or self._notify_conn.closed:
+                    self._notify_conn = self._connect()
+                with self._notify_conn.cursor() as cursor:
+                    for batch in self._batches(payloads):
+                        cursor.execute("SELECT pg_notify(%s, %s)", (CHANNEL, json.dumps(batch)))
+            except Exception as e:
+                print(f"SSE relay notify error: {e}")
+                self._notify_conn = None
+
+
+# Default SSE_MAX_SUBSCRIBERS, per worker, before subscriber_limit() applies.
+MAX_SUBSCRIBERS = 5000
+# Share of a gthread worker's threads that SSE streams may hold; the rest
+# stay free for ordinary requests.
+THREADED_SSE_SHARE = 0.25
+
+
+def subscriber_limit(requested, warn=True):
+    """Caps SSE subscribers at what the gunicorn worker class can carry.
+
+    Each stream holds its request thread for as long as it is open. Under
+    gthread that means at most THREADED_SSE_SHARE of GUNICORN_THREADS; other
+    single-threaded workers take no streams at all. gevent, which
+    gunicorn.conf.py sets up with cooperative psycopg2, runs streams as
+    greenlets and keeps the requested limit.
+    """
+    worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+    if worker_class == "gevent":
+        return requested
+    if worker_class == "gthread":
+        threads = int(os.getenv("GUNICORN_THREADS", "32"))
+    else:
+        threads = 1
+    cap = int(threads * THREADED_SSE_SHARE)
+    if requested > cap:
+        if warn:
+            print(f"Capping SSE subscribers at {cap} per worker ({worker_class}, {threads} threads); "
+                  f"use GUNICORN_WORKER_CLASS=gevent for more")
+        return cap
+    return requested
+
+
+class Broker:
+    """Fans new-project events out to SSE subscriptions in this process."""
+
+    def __init__(self, max_subscribers=MAX_SUBSCRIBERS, max_buffer=100):
+        self.max_subscribers = max_subscribers
+        self.max_buffer = max_buffer
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._relay = None
+
+    def init_app(self, app):
+        requested = os.getenv("SSE_MAX_SUBSCRIBERS")
+        self.max_subscribers = subscriber_limit(int(requested or MAX_SUBSCRIBERS), warn=requested is not None)
+        self.max_buffer = int(os.getenv("SSE_BUFFER_SIZE", self.max_buffer))
+        if (app.config.get("SQLALCHEMY_DATABASE_URI") or "").startswith("postgres"):
+            self._relay = PostgresRelay(app, self.fan_out)
+
+    def subscribe(self, box=None, categories=None, statuses=None):
+        """Registers a subscription, or returns None when at capacity."""
+        subscription = Subscription(box, categories, statuses, self.max_buffer)
+        with self._lock:
+            if len(self._subscriptions) >= self.max_subscribers:
+                return None
+            self._subscriptions.add(subscription)
+        if self._relay:
+            self._relay.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def fan_out(self, payloads):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            for payload in payloads:
+                if subscription.matches(payload):
+                    subscription.push(payload)
+
+    def publish(self, payloads):
+        if self._relay:
+            self._relay.notify(payloads)
+        else:
+            self.fan_out(payloads)
+
+
+broker = Broker()
@@ -0,0 +1,169 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import jsonify, request
+
+# Endpoint name, or (endpoint, method) for routes that serve reads and
+# writes, -> tier. Anything unlisted is 'read' for GET/HEAD and 'write'
+# otherwise; None exempts the endpoint.
+ENDPOINT_TIERS = {
+    'users.clerk_webhook': None,  # signed by Clerk, which retries on 429
+    'core.prometheus_metrics': None,
+    'static': None,
+    'engagement.media_file': None,  # immutable, content-addressed; a feed page loads up to 100
+    ('projects.projects', 'GET'): 'feed',
+    ('projects.projects', 'HEAD'): 'feed',
+    ('projects.projects', 'POST'): 'write',
+    'discovery.search_projects': 'feed',
+    'discovery.project_matches': 'feed',
+    'projects.bulk_projects': 'expensive',
+    'projects.export_projects': 'expensive',
+    ('engagement.upload_project_image', 'POST'): 'expensive',
+    ('engagement.upload_project_image', 'PUT'): 'expensive',
+    'users.run_backfill': 'admin',
+    'projects.delete_all_projects': 'admin',
+}
+# Tier -> (tokens per second, burst). Override with RATE_LIMIT_<TIER>="rate/burst".
+DEFAULT_TIERS = {
+    'read': (10.0, 60),
+    'feed': (5.0, 30),
+    'write': (2.0, 20),
+    'expensive': (0.2, 3),
+    'admin': (1 / 60, 2),
+}
+
+
+class MemoryBackend:
+    """Token buckets in this process; bounded, least recently used dropped first."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, now=None):
+        """Takes one token; returns (allowed, retry_after_seconds)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        retry_after = 0.0 if allowed else (1 - tokens) / rate
+        return allowed, retry_after
+
+
+# Refill, take and store atomically in Redis; the key expires once the
+# bucket would be full again, so idle clients cost nothing.
+_REDIS_TAKE = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBackend:
+    """Token buckets shared by every worker, kept in Redis."""
+
+    def __init__(self, client, prefix="lostconnect:ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+        self._take = client.register_script(_REDIS_TAKE)
+
+    @classmethod
+    def from_url(cls, url):
+        import redis
+        return cls(redis.Redis.from_url(url))
+
+    def take(self, key, rate, burst, now=None):
+        now = time.time() if now is None else now
+        allowed, tokens = self._take(keys=[self.prefix + key], args=[rate, burst, now])
+        tokens = float(tokens)
+        retry_after = 0.0 if allowed else (1 - tokens) / rate
+        return bool(allowed), retry_after
+
+
+class RateLimiter:
+    """Token buckets per client and endpoint, sized by the endpoint's tier.
+
+    Clients are identified by IP address. Behind RATE_LIMIT_TRUSTED_PROXIES
+    proxies (default 1, the platform router) the address is read from
+    X-Forwarded-For, counting from the right so clients cannot pick their
+    own key by sending the header.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryBackend()
+        self.tiers = dict(DEFAULT_TIERS)
+        self.trusted_proxies = 1
+        self.enabled = True
+
+    def init_app(self, app):
+        self.enabled = os.getenv("RATE_LIMIT_ENABLED", "true").lower() not in ("0", "false", "no")
+        url = os.getenv("RATE_LIMIT_URL")
+        self.backend = RedisBackend.from_url(url) if url else MemoryBackend()
+        self.trusted_proxies = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", self.trusted_proxies))
+        for tier in DEFAULT_TIERS:
+            override = os.getenv(f"RATE_LIMIT_{tier.upper()}")
+            if override:
+                rate, burst = override.split("/")
+                self.tiers[tier] = (float(rate), int(burst))
+        app.before_request(self._check)
+
+    def client_id(self):
+        forwarded = [part.strip() for part in request.headers.get("X-Forwarded-For", "").split(",") if part.strip()]
+        if self.trusted_proxies and forwarded:
+            return forwarded[-min(self.trusted_proxies, len(forwarded))]
+        return request.remote_addr or "unknown"
+
+    def tier_for(self, endpoint, method):
+        if (endpoint, method) in ENDPOINT_TIERS:
+            return ENDPOINT_TIERS[(endpoint, method)]
+        if endpoint in ENDPOINT_TIERS:
+            return ENDPOINT_TIERS[endpoint]
+        return 'read' if method in ("GET", "HEAD") else 'write'
+
+    def _check(self):
+        if not self.enabled or request.method == "OPTIONS" or request.endpoint is None:
+            return None
+        tier = self.tier_for(request.endpoint, request.method)
+        if tier is None:
+            return None
+
+        rate, burst = self.tiers[tier]
+        try:
+            key = f"{tier}:{request.endpoint}:{self.client_id()}"
+            allowed, retry_after = self.backend.take(key, rate, burst)
+        except Exception as e:
+            # A shared-backend outage should not take the API down with it.
+            print(f"Rate limiter backend error, allowing request: {e}")
+            return None
+        if allowed:
+            return None
+
+        response = jsonify({'error': 'Too many requests', 'retry_after': math.ceil(retry_after)})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(math.ceil(retry_after))
+        return response
+
+
+limiter = RateLimiter()
@@ -0,0 +1,192 @@
+import math
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import func, literal_column, true
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import joinedload
+
+from changes import RESCAN_WINDOW
+from database import db
+from model import Project, ProjectTombstone
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its near of on or
+the this to was were with i my our we
+""".split())
+TITLE_WEIGHT = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall((text or "").lower()) if token not in STOPWORDS]
+
+
+class TokenIndex:
+    """In-process BM25 inverted index over project titles and descriptions.
+
+    Used when the database has no native full-text search (SQLite in
+    development). Title terms count TITLE_WEIGHT times, mirroring the
+    'A' weight given to titles in the Postgres tsvector. Like
+    matching.MatchIndex, sync() catches up with the database before each
+    search (new ids, rows updated within RESCAN_WINDOW, new tombstones), so
+    reports created or deleted through another worker are seen too.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._postings = defaultdict(dict)
+        self._lengths = {}
+        self._meta = {}
+        self._terms = {}
+        self._total_length = 0
+        self._last_id = 0
+        self._last_tombstone = 0
+        self._synced_at = None
+
+    def _add(self, project_id, title, description, status, category):
+        self._last_id = max(self._last_id, project_id)
+        self._remove(project_id)  # rescanned rows replace their postings
+        terms = defaultdict(int)
+        for token in tokenize(title):
+            terms[token] += TITLE_WEIGHT
+        for token in tokenize(description):
+            terms[token] += 1
+        for token, frequency in terms.items():
+            self._postings[token][project_id] = frequency
+        length = sum(terms.values())
+        self._lengths[project_id] = length
+        self._total_length += length
+        self._meta[project_id] = (status, category)
+        self._terms[project_id] = list(terms)
+
+    def _remove(self, project_id):
+        terms = self._terms.pop(project_id, None)
+        if terms is None:
+            return
+        for token in terms:
+            postings = self._postings[token]
+            postings.pop(project_id, None)
+            if not postings:
+                del self._postings[token]
+        self._total_length -= self._lengths.pop(project_id)
+        del self._meta[project_id]
+
+    def add(self, project):
+        with self._lock:
+            if self._synced_at is not None:
+                self._add(project.id, project.title, project.description, project.status, project.category)
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def sync(self):
+        """Applies inserts, updates and deletions committed since the last sync."""
+        with self._lock:
+            started = datetime.utcnow()
+            if self._synced_at is not None:
+                tombstones = db.session.execute(
+                    db.select(ProjectTombstone.id, ProjectTombstone.project_id)
+                    .where(ProjectTombstone.id > self._last_tombstone)
+                    .order_by(ProjectTombstone.id)
+                ).all()
+                for tombstone_id, project_id in tombstones:
+                    if project_id is None:
+                        self._clear()
+                        break
+                    self._remove(project_id)
+                    self._last_tombstone = tombstone_id
+
+            if self._synced_at is None:
+                # A full load; earlier tombstones are already reflected in the table.
+                self._last_tombstone = db.session.execute(db.select(func.max(ProjectTombstone.id))).scalar() or 0
+                self._last_id = db.session.execute(db.select(func.max(Project.id))).scalar() or 0
+                queries = [(true(), Project.id)]
+            else:
+                # Two queries rather than an OR, so each is served by its own index.
+                queries = [
+                    (Project.id > self._last_id, Project.id),
+                    (Project.updated_at >= self._synced_at - RESCAN_WINDOW, Project.updated_at),
+                ]
+            for clause, order in queries:
+                rows = db.session.execute(
+                    db.select(Project.id, Project.title, Project.description, Project.status, Project.category)
+                    .where(clause)
+                    .order_by(order)
+                    .execution_options(yield_per=1000)
+                )
+                for row in rows:
+                    self._add(*row)
+            self._synced_at = started
+
+    def search(self, query, status=None, category=None, limit=20, offset=0):
+        """Returns BM25-ranked project ids for a page of results."""
+        terms = set(tokenize(query))
+        with self._lock:
+            if not terms or not self._lengths:
+                return []
+            total_docs = len(self._lengths)
+            average_length = self._total_length / total_docs
+            scores = defaultdict(float)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for project_id, frequency in postings.items():
+                    doc_status, doc_category = self._meta[project_id]
+                    if status and doc_status != status:
+                        continue
+                    if category and doc_category != category:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[project_id] / average_length)
+                    scores[project_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return [project_id for project_id, _ in ranked[offset:offset + limit]]
+
+
+token_index = TokenIndex()
+
+
+def uses_postgres():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def project_indexed(project):
+    if not uses_postgres():
+        token_index.add(project)
+
+
+def projects_cleared():
+    token_index.clear()
+
+
+def search_projects(query, status=None, category=None, limit=20, offset=0):
+    """Returns a ranked page of Projects matching a free-text query."""
+    if uses_postgres():
+        tsquery = func.websearch_to_tsquery('english', query)
+        vector = literal_column('project.search_vector', type_=TSVECTOR)
+        rank = func.ts_rank_cd(vector, tsquery)
+        results = Project.query.options(joinedload(Project.user)).filter(vector.op('@@')(tsquery))
+        if status:
+            results = results.filter(Project.status == status)
+        if category:
+            results = results.filter(Project.category == category)
+        return results.order_by(rank.desc(), Project.id.desc()).offset(offset).limit(limit).all()
+
+    token_index.sync()
+    ids = token_index.search(query, status, category, limit, offset)
+    if not ids:
+        return []
+    projects = Project.query.options(joinedload(Project.user)).filter(Project.id.in_(ids)).all()
+    by_id = {project.id: project for project in projects}
+    return [by_id[project_id] for project_id in ids if project_id in by_id]
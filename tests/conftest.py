@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv("MEDIA_ROOT", str(tmp_path / "media"))
+    monkeypatch.setenv("RATE_LIMIT_ENABLED", "false")
+    monkeypatch.setenv("CLERK_API_URL", "http://127.0.0.1:9")
+
+    from app import create_app
+    from database import db
+
+    app = create_app()
+    with app.app_context():
+        # Postgres always enforces foreign keys; make SQLite do the same.
+        event.listen(db.engine, "connect", lambda connection, record: connection.execute("PRAGMA foreign_keys=ON"))
+        db.engine.dispose()
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+import backfill
+from database import db
+from model import BackfillCheckpoint, BackfillRun
+
+
+def test_second_claim_attaches_to_the_running_job(app):
+    job, created = backfill.claim(app)
+    assert created
+    again, created = backfill.claim(app)
+    assert not created
+    assert again.id == job.id
+    assert BackfillCheckpoint.query.count() == 1
+
+    # Any worker can report on it; the registry is the database.
+    assert backfill.get_job(job.id).to_dict()['status'] == "queued"
+    assert backfill.get_job("missing") is None
+
+
+def test_stale_run_is_replaced(app):
+    job, _ = backfill.claim(app)
+    db.session.get(BackfillRun, job.id).heartbeat_at = datetime.utcnow() - timedelta(hours=1)
+    db.session.commit()
+
+    replacement, created = backfill.claim(app)
+    assert created
+    assert replacement.id != job.id
+    abandoned = backfill.get_job(job.id).to_dict()
+    assert abandoned['status'] == "failed"
+    assert abandoned['error']
+
+
+def test_status_survives_the_job_finishing(app):
+    job, _ = backfill.claim(app)
+    job.run()
+    status = backfill.get_job(job.id).to_dict()
+    assert status['status'] == "complete"
+    assert status['processed'] == 0
+    assert db.session.get(BackfillCheckpoint, backfill.JOB_NAME).last_key is None
@@ -0,0 +1,31 @@
+from cache import DatabaseVersion, LocalBackend, response_cache
+
+
+def test_local_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("cache.time.monotonic", lambda: now[0])
+    backend = LocalBackend()
+    backend.set("key", "value", ttl=5)
+    assert backend.get("key") == "value"
+    now[0] += 6
+    assert backend.get("key") is None
+
+
+def test_version_bumps_reach_other_workers(app):
+    worker_a = DatabaseVersion("feed:version", max_age=0)
+    worker_b = DatabaseVersion("feed:version", max_age=0)
+    assert worker_b.get() == 0
+    worker_a.incr()
+    assert worker_b.get() == 1
+
+
+def test_write_invalidates_cached_feed(app):
+    client = app.test_client()
+    assert client.get("/projects").get_json() == []
+    response = client.post("/projects", json={
+        'title': "Lost cat", 'description': "Grey tabby", 'category': "animal", 'status': "lost",
+        'lat': 52.52, 'lng': 13.40, 'user_id': "u1", 'user_name': "Owner"
+    })
+    assert response.status_code == 201
+    assert response_cache.shared_version is not None
+    assert [project['title'] for project in client.get("/projects").get_json()] == ["Lost cat"]
@@ -0,0 +1,37 @@
+import changes
+import clusters
+from database import db
+from model import Project
+
+BOX = (52.0, 13.0, 53.0, 14.0)
+
+
+def total(result):
+    return sum(cluster['count'] for cluster in result['clusters'])
+
+
+def test_sees_projects_written_by_other_workers(app, monkeypatch):
+    monkeypatch.setattr(clusters, "cache", clusters.ClusterCache())
+    db.session.add(Project(title="Lost dog", status="lost", lat=52.5, lng=13.4))
+    db.session.commit()
+    assert total(clusters.viewport_clusters(*BOX, 10)) == 1
+
+    # Committed without events.project_created, as another worker would.
+    db.session.add(Project(title="Found dog", status="found", lat=52.51, lng=13.41))
+    db.session.commit()
+    assert total(clusters.viewport_clusters(*BOX, 10)) == 2
+
+    Project.query.delete()
+    changes.record_reset()
+    db.session.commit()
+    assert total(clusters.viewport_clusters(*BOX, 10)) == 0
+
+
+def test_cells_expire_after_ttl(app, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("clusters.time.monotonic", lambda: now[0])
+    cache = clusters.ClusterCache(ttl=10)
+    cache.put_many({'u33': {'count': 1}}, cache.generation)
+    assert cache.get_many(['u33']) == {'u33': {'count': 1}}
+    now[0] += 11
+    assert cache.get_many(['u33']) == {}
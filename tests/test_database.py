@@ -0,0 +1,8 @@
+import database
+
+
+def test_statement_timeout_is_skipped_for_cli_commands(monkeypatch):
+    monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "30000")
+    url = "postgresql://localhost/lostconnect"
+    assert database.engine_options(url)['connect_args']['options'] == "-c statement_timeout=30000"
+    assert 'options' not in database.engine_options(url, statement_timeout=False)['connect_args']
@@ -0,0 +1,18 @@
+import clusters
+import explain_check
+import matching
+import search
+from app import create_app
+
+
+def test_hot_queries_use_indexes(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'explain.db'}")
+    monkeypatch.setenv("MEDIA_ROOT", str(tmp_path / "media"))
+    monkeypatch.setenv("RATE_LIMIT_ENABLED", "false")
+    # The in-process indexes are module globals; start them empty.
+    monkeypatch.setattr(clusters, "cache", clusters.ClusterCache())
+    monkeypatch.setattr(matching, "index", matching.MatchIndex())
+    monkeypatch.setattr(search, "token_index", search.TokenIndex())
+
+    failures = explain_check.run(create_app())
+    assert not failures, "\n".join(failures)
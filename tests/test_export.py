@@ -0,0 +1,27 @@
+import csv
+import io
+import json
+
+from database import db
+from model import Project, User
+
+
+def test_csv_and_ndjson_carry_the_same_fields(app):
+    db.session.add(User(id="u1", name="Owner", email="owner@example.com"))
+    db.session.add_all([
+        Project(title="Lost dog", status="lost", lat=52.5, lng=13.4, user_id="u1"),
+        Project(title="Found cat", status="found", lat=52.6, lng=13.5),
+    ])
+    db.session.commit()
+    client = app.test_client()
+
+    ndjson = [json.loads(line) for line in client.get("/projects/export?format=ndjson").get_data(as_text=True).splitlines()]
+    rows = list(csv.DictReader(io.StringIO(client.get("/projects/export?format=csv").get_data(as_text=True))))
+
+    assert len(ndjson) == len(rows) == 2
+    for record, row in zip(ndjson, rows):
+        creator = record.pop('creator')
+        record.update({'creator_id': creator['id'], 'creator_name': creator['name'], 'creator_email': creator['email']})
+        assert set(row) == set(record)
+        assert row == {key: "" if value is None else str(value) for key, value in record.items()}
+    assert rows[1]['creator_name'] == "Unknown"
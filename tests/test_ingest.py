@@ -0,0 +1,35 @@
+import json
+
+import ingest
+from model import Project
+
+
+def report(i, **overrides):
+    line = {'title': f"Report {i}", 'description': "d", 'category': "animal", 'status': "lost",
+            'lat': 52.5, 'lng': 13.4, 'user_id': f"u{i}", 'user_email': f"u{i}@example.com"}
+    line.update(overrides)
+    return json.dumps(line)
+
+
+def test_rejects_bad_values_up_front():
+    for overrides in ({'lat': "nan"}, {'lat': 500}, {'lng': "inf"}, {'title': "x" * 256},
+                      {'status': "definitely-lost"}, {'title': 7}, {'user_name': "n" * 101}):
+        fields, error = ingest.validate_project(json.loads(report(1, **overrides)))
+        assert fields is None and error, overrides
+
+
+def test_database_error_only_fails_its_own_line(app):
+    lines = [report(i) for i in range(1, 6)]
+    lines[2] = report(3, user_email="u1@example.com")  # unique email clash with line 1
+
+    results = list(ingest.ingest_ndjson(lines, chunk_size=10))
+    summary = results.pop()['summary']
+
+    assert summary == {'inserted': 4, 'failed': 1}
+    assert [result['line'] for result in results if 'error' in result] == [3]
+    assert Project.query.count() == 4
+
+
+def test_post_projects_rejects_nan_coordinates(app):
+    response = app.test_client().post("/projects", json=json.loads(report(1, lat="nan")))
+    assert response.status_code == 400
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+import matching
+from database import db
+from matching import MatchIndex
+from model import Project
+
+
+def _report(status, **fields):
+    return Project(title="Black backpack", description="Lost near the station", category="item",
+                   status=status, lat=52.52, lng=13.40, **fields)
+
+
+def test_ids_committed_out_of_order_are_indexed(app):
+    index = MatchIndex()
+    db.session.add(_report("lost", id=600))
+    db.session.commit()
+    index.sync()
+
+    # A slower transaction took a lower id and commits after the sync.
+    db.session.add(_report("found", id=100))
+    db.session.commit()
+    index.sync()
+
+    lost = db.session.get(Project, 600)
+    assert [project_id for _, _, project_id in index.candidates(lost)] == [100]
+
+
+def test_reports_past_matching_age_are_evicted(app, monkeypatch):
+    now = datetime.utcnow()
+    db.session.add_all([
+        _report("found", date=now - timedelta(days=matching.MAX_DAYS + 5)),
+        _report("found", date=now - timedelta(days=40)),
+    ])
+    db.session.commit()
+    index = MatchIndex()
+    index.sync()
+    assert len(index._entries) == 1
+
+    monkeypatch.setattr(matching, "MAX_DAYS", 30)
+    index.sync()
+    assert index._entries == {}
@@ -0,0 +1,67 @@
+import io
+from concurrent.futures import Future
+
+from PIL import Image
+
+import media
+from database import db
+from model import Project, User
+
+
+def _project():
+    db.session.add(User(id="u1", name="Owner", email="owner@example.com"))
+    project = Project(title="Lost cat", status="lost", user_id="u1", image_hash="0" * 64,
+                      thumbnail_url="/media/old-thumb.jpg", image_url="/media/old-web.jpg", image_status="ready")
+    db.session.add(project)
+    db.session.commit()
+    return project
+
+
+def _png():
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 30), "red").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class PendingExecutor:
+    def submit(self, *args):
+        return Future()
+
+
+def test_undecodable_upload_is_rejected_before_storing(app):
+    project = _project()
+    response = app.test_client().post(f"/projects/{project.id}/image?user_id=u1", data=b"\xff\xd8\xff" + b"x" * 64)
+    assert response.status_code == 415
+    db.session.refresh(project)
+    assert project.image_hash == "0" * 64 and project.image_status == "ready"
+    assert not media.pipeline.storage.exists(media.original_key(project.image_hash, "jpg"))
+
+
+def test_new_upload_clears_previous_urls_until_processed(app, monkeypatch):
+    project = _project()
+    monkeypatch.setattr(media.pipeline, "_get_executor", lambda: PendingExecutor())
+    response = app.test_client().post(f"/projects/{project.id}/image?user_id=u1", data=_png())
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body['status'] == "processing"
+    assert body['thumbnail_url'] is None and body['image_url'] is None
+    assert app.test_client().get(f"/projects/{project.id}/image").get_json() == body
+
+
+def test_failed_processing_is_recorded_and_original_removed(app, monkeypatch):
+    project = _project()
+    monkeypatch.setattr(media.pipeline, "_get_executor", lambda: PendingExecutor())
+    digest = app.test_client().post(f"/projects/{project.id}/image?user_id=u1", data=_png()).get_json()['image_hash']
+    key = media.original_key(digest, "png")
+    assert media.pipeline.storage.exists(key)
+
+    future = Future()
+    future.set_exception(OSError("cannot identify image file"))
+    path = media.pipeline.storage.local_path(key) + ".tmp"
+    open(path, "wb").close()
+    media.pipeline._store_variants(future, path, digest, key)
+    db.session.expire_all()
+
+    body = app.test_client().get(f"/projects/{project.id}/image").get_json()
+    assert body['status'] == "failed"
+    assert not media.pipeline.storage.exists(key)
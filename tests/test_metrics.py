@@ -0,0 +1,49 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+
+import metrics
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def _sample(text, name):
+    return [line for line in text.splitlines() if line.startswith(name + " ") or line.startswith(name + "{")]
+
+
+def test_scrapes_sum_every_workers_snapshot(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics.instrumentation, "metrics_dir", str(tmp_path / "metrics"))
+    client = app.test_client()
+    client.get("/")
+    os.makedirs(tmp_path / "metrics", exist_ok=True)
+    with open(tmp_path / "metrics" / f"{_dead_pid()}.json", "w") as f:
+        json.dump({
+            'sql_statements_total': [[["SELECT"], 1000]],
+            'http_request_duration_seconds': [[["GET", "/", 200], [3] * len(metrics.LATENCY_BUCKETS), 0.03, 3]],
+            'extra': [["db_pool_checked_out", "gauge", 50], ["db_pool_connects_total", "counter", 7]],
+        }, f)
+
+    text = client.get("/metrics").get_data(as_text=True)
+    own = metrics.sql_statements.snapshot()
+    own_selects = sum(value for labels, value in own if labels == ["SELECT"])
+    assert f'sql_statements_total{{kind="SELECT"}} {own_selects + 1000}' in text
+    count = [line for line in text.splitlines()
+             if line.startswith('http_request_duration_seconds_count{method="GET",route="/",status="200"}')]
+    assert int(count[0].split()[-1]) >= 4
+    # The exited worker's counter stays in the total; its gauge does not.
+    assert int(_sample(text, "db_pool_connects_total")[0].split()[-1]) >= 7
+    assert all(int(line.split()[-1]) < 50 for line in _sample(text, "db_pool_checked_out"))
+    assert os.path.exists(tmp_path / "metrics" / f"{os.getpid()}.json")
+
+
+def test_slow_queries_are_logged_as_warnings(app, monkeypatch, caplog):
+    monkeypatch.setattr(metrics.instrumentation, "slow_query_seconds", 0)
+    with caplog.at_level(logging.WARNING, logger="metrics"):
+        app.test_client().get("/projects")
+    assert any(record.message.startswith("Slow query") for record in caplog.records)
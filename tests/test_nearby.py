@@ -0,0 +1,67 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import geo
+from database import db
+from model import Project
+
+
+@pytest.mark.parametrize("url", [
+    "/projects/nearby?lat=nan&lng=0&radius_km=1",
+    "/projects/nearby?lat=0&lng=0&radius_km=inf",
+    "/projects/nearby?lat=91&lng=0&radius_km=1",
+    "/projects/nearby?min_lat=nan&min_lng=0&max_lat=1&max_lng=1",
+    "/projects/nearby?min_lat=0&min_lng=-inf&max_lat=1&max_lng=1",
+    "/projects/clusters?min_lat=nan&min_lng=0&max_lat=1&max_lng=1&zoom=5",
+    "/projects/clusters?min_lat=0&min_lng=0&max_lat=1&max_lng=500&zoom=5",
+])
+def test_rejects_non_finite_and_out_of_range_coordinates(app, url):
+    assert app.test_client().get(url).status_code == 400
+
+
+def test_box_returns_newest_projects_inside_it(app):
+    rng = random.Random(2)
+    now = datetime.utcnow()
+    db.session.add_all([
+        Project(title=f"Report {i}", status="lost", lat=12.0 + rng.random() * 2, lng=77.0 + rng.random() * 2,
+                date=now - timedelta(minutes=rng.randrange(100000)))
+        for i in range(2000)
+    ])
+    db.session.commit()
+
+    box = (12.3, 77.2, 13.6, 78.7)
+    expected = sorted(
+        (project for project in Project.query if geo.in_box(project.lat, project.lng, *box)),
+        key=lambda project: (project.date, project.id), reverse=True
+    )[:25]
+    response = app.test_client().get(
+        "/projects/nearby?min_lat=12.3&min_lng=77.2&max_lat=13.6&max_lng=78.7&limit=25"
+    )
+    assert [item['id'] for item in response.get_json()] == [project.id for project in expected]
+
+
+def test_radius_above_the_cap_is_rejected(app):
+    response = app.test_client().get(f"/projects/nearby?lat=0&lng=0&radius_km={geo.MAX_RADIUS_KM + 1}")
+    assert response.status_code == 400
+    assert app.test_client().get("/projects/nearby?lat=0&lng=0&radius_km=30000").status_code == 400
+
+
+def test_radius_returns_nearest_projects_inside_it(app):
+    rng = random.Random(3)
+    db.session.add_all([
+        Project(title=f"Report {i}", status="lost", lat=12.0 + rng.random() * 2, lng=77.0 + rng.random() * 2)
+        for i in range(2000)
+    ])
+    db.session.commit()
+
+    center, radius_km = (12.95, 77.55), 20
+    distances = sorted(
+        (geo.haversine_km(*center, project.lat, project.lng), project.id) for project in Project.query
+    )
+    expected = [project_id for distance, project_id in distances if distance <= radius_km][:25]
+    response = app.test_client().get("/projects/nearby?lat=12.95&lng=77.55&radius_km=20&limit=25")
+    items = response.get_json()
+    assert [item['id'] for item in items] == expected
+    assert all(item['distance_km'] <= radius_km for item in items)
@@ -0,0 +1,50 @@
+import json
+
+import outbox
+from database import db
+from model import Project, User, WebhookEvent
+
+
+def user_event(event_type, user_id, email=None, first_name=""):
+    data = {'id': user_id, 'first_name': first_name}
+    if email:
+        data['email_addresses'] = [{'email_address': email}]
+    return {'type': event_type, 'data': data}
+
+
+def test_deleting_user_keeps_their_projects(app):
+    db.session.add(User(id="u1", name="Owner", email="owner@example.com"))
+    db.session.add(Project(title="Lost dog", status="lost", user_id="u1"))
+    db.session.commit()
+
+    outbox.enqueue("evt-1", user_event("user.deleted", "u1"))
+    assert outbox.process_pending() == 1
+
+    webhook_event = db.session.get(WebhookEvent, "evt-1")
+    assert webhook_event.processed_at is not None
+    assert webhook_event.failed_at is None
+    assert db.session.get(User, "u1") is None
+    project = Project.query.one()
+    assert project.user_id is None
+    assert project.to_dict()['creator']['name'] == "Unknown"
+
+
+def test_failing_event_does_not_block_the_queue(app):
+    outbox.enqueue("evt-1", user_event("user.created", "u1", "same@example.com", "First"))
+    outbox.enqueue("evt-2", user_event("user.created", "u2", "same@example.com", "Second"))
+    outbox.enqueue("evt-3", user_event("user.created", "u3", "other@example.com", "Third"))
+
+    assert outbox.process_pending() == 3
+
+    failed = db.session.get(WebhookEvent, "evt-2")
+    assert failed.processed_at is None
+    assert failed.failed_at is not None
+    assert failed.error
+    assert db.session.get(WebhookEvent, "evt-1").processed_at is not None
+    assert db.session.get(WebhookEvent, "evt-3").processed_at is not None
+    assert sorted(user.id for user in User.query) == ["u1", "u3"]
+
+    outbox.enqueue("evt-4", user_event("user.updated", "u3", "other@example.com", "Renamed"))
+    assert outbox.process_pending() == 1
+    assert json.loads(db.session.get(WebhookEvent, "evt-4").payload)['type'] == "user.updated"
+    assert db.session.get(User, "u3").name == "Renamed"
@@ -0,0 +1,22 @@
+from ratelimit import ENDPOINT_TIERS, MemoryBackend, limiter
+
+
+def test_media_files_are_exempt(app, monkeypatch):
+    monkeypatch.setattr(limiter, "enabled", True)
+    monkeypatch.setattr(limiter, "backend", MemoryBackend())
+    client = app.test_client()
+    statuses = {client.get("/media/ab/missing.jpg").status_code for _ in range(80)}
+    assert 429 not in statuses
+
+
+def test_report_creation_has_its_own_write_budget(app, monkeypatch):
+    monkeypatch.setattr(limiter, "enabled", True)
+    monkeypatch.setattr(limiter, "backend", MemoryBackend())
+    assert limiter.tier_for('projects.projects', "GET") == 'feed'
+    assert limiter.tier_for('projects.projects', "POST") == 'write'
+    assert ENDPOINT_TIERS['engagement.media_file'] is None
+
+    client = app.test_client()
+    burst = limiter.tiers['feed'][1]
+    assert [client.get("/projects").status_code for _ in range(burst + 1)][-1] == 429
+    assert client.post("/projects", json={}).status_code == 400
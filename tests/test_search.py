@@ -0,0 +1,35 @@
+import changes
+from database import db
+from model import Project
+from search import TokenIndex
+
+
+def test_index_sees_writes_from_other_workers(app):
+    other_worker = TokenIndex()
+    other_worker.sync()
+    assert other_worker.search("backpack") == []
+
+    # Written without this index's hooks, as another worker would.
+    project = Project(title="Black backpack", description="Left on the tram", status="lost")
+    db.session.add(project)
+    db.session.commit()
+    other_worker.sync()
+    assert other_worker.search("backpack") == [project.id]
+
+    Project.query.delete()
+    changes.record_reset()
+    db.session.commit()
+    other_worker.sync()
+    assert other_worker.search("backpack") == []
+
+
+def test_ids_committed_out_of_order_are_indexed(app):
+    index = TokenIndex()
+    db.session.add(Project(id=600, title="Red umbrella", status="found"))
+    db.session.commit()
+    index.sync()
+
+    db.session.add(Project(id=100, title="Blue umbrella", status="lost"))
+    db.session.commit()
+    index.sync()
+    assert sorted(index.search("umbrella")) == [100, 600]
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+import pubsub
+
+
+def test_subscribers_stay_below_gthread_threads(monkeypatch):
+    monkeypatch.setenv("GUNICORN_WORKER_CLASS", "gthread")
+    monkeypatch.setenv("GUNICORN_THREADS", "32")
+    assert pubsub.subscriber_limit(5000) == 8
+    assert pubsub.subscriber_limit(4) == 4
+
+    monkeypatch.setenv("GUNICORN_WORKER_CLASS", "gevent")
+    assert pubsub.subscriber_limit(5000) == 5000
+
+
+def test_sync_workers_refuse_streams(app, monkeypatch):
+    monkeypatch.setenv("GUNICORN_WORKER_CLASS", "sync")
+    pubsub.broker.init_app(app)
+    assert app.test_client().get("/projects/stream").status_code == 503
+
+
+def test_gevent_workers_patch_psycopg2():
+    # patch_all() cannot be undone, so load the config in its own interpreter.
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    probe = (
+        "import runpy, psycopg2.extensions, socket, gevent.socket\n"
+        "config = runpy.run_path('gunicorn.conf.py')\n"
+        "assert socket.socket is gevent.socket.socket\n"
+        "assert psycopg2.extensions.get_wait_callback() is None\n"
+        "config['post_fork'](None, None)\n"
+        "assert psycopg2.extensions.get_wait_callback() is not None\n"
+    )
+    env = dict(os.environ, GUNICORN_WORKER_CLASS="gevent")
+    completed = subprocess.run([sys.executable, "-c", probe], cwd=root, env=env, capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
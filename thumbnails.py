@@ -0,0 +1,46 @@
+"""Image resizing run inside media.py's process pool.
+
+Kept free of Flask and database imports so spawned workers start fast.
+"""
+import io
+
+from PIL import Image, ImageOps
+
+# Refuse decompression bombs well before they exhaust a worker's memory.
+Image.MAX_IMAGE_PIXELS = 50_000_000
+
+
+def check_image(path):
+    """Returns the (width, height) of the image at `path`.
+
+    Raises ValueError if Pillow cannot parse it or it is larger than
+    MAX_IMAGE_PIXELS. Only headers and structure are checked, so this is
+    cheap enough to run on the request thread.
+    """
+    try:
+        with Image.open(path) as image:
+            image.verify()
+            width, height = image.size
+    except Exception as e:
+        raise ValueError(f"Unreadable image: {e}")
+    if not width or not height:
+        raise ValueError("Image has no pixels")
+    if width * height > Image.MAX_IMAGE_PIXELS:
+        raise ValueError(f"Image has more than {Image.MAX_IMAGE_PIXELS} pixels")
+    return width, height
+
+
+def render_variants(path, sizes, quality=82):
+    """Returns {name: jpeg_bytes} with the image at `path` fitted into each size."""
+    with Image.open(path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        variants = {}
+        for name, (width, height) in sizes.items():
+            variant = image.copy()
+            variant.thumbnail((width, height), Image.LANCZOS)
+            buffer = io.BytesIO()
+            variant.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+            variants[name] = buffer.getvalue()
+        return variants
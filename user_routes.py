@@ -0,0 +1,82 @@
+import base64
+import hashlib
+import hmac
+import os
+
+from flask import Blueprint, current_app, jsonify, request
+
+import backfill
+import clerk
+import outbox
+from database import db
+from model import User
+
+bp = Blueprint('users', __name__)
+
+
+@bp.route('/webhook', methods=['POST'])
+def clerk_webhook():
+    webhook_secret = os.getenv("CLERK_WEBHOOK_SECRET")
+    if not webhook_secret:
+        return jsonify({'error': 'Webhook secret not configured'}), 200
+
+    signature = request.headers.get("Clerk-Signature")
+    payload = request.data  # raw body
+
+    # Verify signature using HMAC-SHA256
+    expected_signature = base64.b64encode(
+        hmac.new(webhook_secret.encode(), payload, hashlib.sha256).digest()
+    ).decode()
+
+    if not hmac.compare_digest(signature or "", expected_signature):
+        return jsonify({'error': 'Invalid webhook signature'}), 403
+
+    event = request.get_json(silent=True)
+    if not isinstance(event, dict):
+        return jsonify({'error': 'Invalid JSON data'}), 400
+
+    # Applied in coalesced batches by the outbox worker; redeliveries of
+    # an event already stored are acknowledged without further work.
+    if outbox.enqueue(outbox.event_id(request.headers, payload), event):
+        outbox.worker.wake()
+
+    return jsonify({'message': 'Webhook received'}), 200
+
+
+@bp.route('/users', methods=['POST'])
+def create_user():
+    data = request.get_json()
+    user_id = data.get("id")
+    email = data.get("email")
+
+    if not user_id or not email:
+        return jsonify({'error': 'User ID and email are required'}), 400
+
+    # Check if user already exists
+    existing_user = User.query.get(user_id)
+    if existing_user:
+        return jsonify({'message': 'User already exists'}), 200
+
+    try:
+        full_name = clerk.get_user_name(user_id) or "Unknown"
+        new_user = User(id=user_id, email=email, name=full_name)
+        db.session.add(new_user)
+        db.session.commit()
+        return jsonify({'message': 'User created successfully', 'id': new_user.id, 'name': new_user.name, 'email': new_user.email}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route("/run-backfill", methods=["GET", "POST"])
+def run_backfill():
+    job = backfill.start(current_app._get_current_object())
+    return jsonify({'message': 'Backfill started', 'job': job.to_dict()}), 202
+
+
+@bp.route("/run-backfill/<job_id>", methods=["GET"])
+def backfill_status(job_id):
+    job = backfill.get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Unknown backfill job'}), 404
+    return jsonify(job.to_dict())
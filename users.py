@@ -0,0 +1,90 @@
+from datetime import datetime
+
+from sqlalchemy import case
+
+from database import db, dialect_insert
+from model import User
+
+PLACEHOLDER_NAME = "Unknown"
+
+
+def upsert_user(user_id, email=None, name=None, overwrite_email=False):
+    """Creates or updates a user in one statement and returns its stored name.
+
+    A missing name inserts PLACEHOLDER_NAME and leaves an existing name
+    alone; a given name always wins. The existing email is only replaced
+    with overwrite_email. Runs as INSERT ... ON CONFLICT (id) DO UPDATE, so
+    concurrent webhook and POST /projects calls can't race each other into
+    duplicate-key errors. Does not commit.
+    """
+    table = User.__table__
+    insert = dialect_insert()
+    if insert is None:
+        return _merge_user(user_id, email, name, overwrite_email)
+
+    stmt = insert(table).values(
+        id=user_id,
+        email=email,
+        name=name or PLACEHOLDER_NAME,
+        created_at=datetime.utcnow()
+    )
+    # Always update something so RETURNING yields the row on conflict.
+    set_ = {'name': stmt.excluded.name if name else table.c.name}
+    if overwrite_email:
+        set_['email'] = stmt.excluded.email
+    stmt = stmt.on_conflict_do_update(index_elements=[table.c.id], set_=set_).returning(table.c.name)
+    return db.session.execute(stmt).scalar_one()
+
+
+def upsert_users(entries, overwrite_email=False):
+    """Bulk variant of upsert_user for dicts of id, email and name.
+
+    Returns {user_id: stored_name}. Does not commit.
+    """
+    if not entries:
+        return {}
+    table = User.__table__
+    insert = dialect_insert()
+    if insert is None:
+        return {
+            entry['id']: _merge_user(entry['id'], entry.get('email'), entry.get('name'), overwrite_email)
+            for entry in entries
+        }
+
+    # One row per id: Postgres refuses to update the same row twice in a
+    # single INSERT ... ON CONFLICT. Later entries win, except that a
+    # missing name never replaces a given one.
+    now = datetime.utcnow()
+    rows = {}
+    for entry in entries:
+        previous = rows.get(entry['id'])
+        rows[entry['id']] = {
+            'id': entry['id'],
+            'email': entry.get('email') or (previous and previous['email']),
+            'name': entry.get('name') or (previous and previous['name']) or PLACEHOLDER_NAME,
+            'created_at': now
+        }
+    stmt = insert(table)
+    set_ = {'name': case((stmt.excluded.name != PLACEHOLDER_NAME, stmt.excluded.name), else_=table.c.name)}
+    if overwrite_email:
+        set_['email'] = stmt.excluded.email
+    stmt = stmt.on_conflict_do_update(index_elements=[table.c.id], set_=set_).returning(table.c.id, table.c.name)
+    return dict(db.session.execute(stmt, list(rows.values())).all())
+
+
+def _merge_user(user_id, email, name, overwrite_email):
+    user = db.session.get(User, user_id)
+    if user is None:
+        user = User(id=user_id, email=email, name=name or PLACEHOLDER_NAME)
+        db.session.add(user)
+    else:
+        if name:
+            user.name = name
+        if overwrite_email:
+            user.email = email
+    db.session.flush()
+    return user.name
+
+
+def needs_name(name):
+    return not name or name == PLACEHOLDER_NAME